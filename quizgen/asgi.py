@@ -3,6 +3,10 @@ ASGI config for quizgen project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The chat and quiz generation views are async, so serve the app with an ASGI
+server (e.g. ``uvicorn quizgen.asgi:application --workers 4``) to keep many
+LLM calls in flight per process.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
 from .forms import CustomUserCreationForm, CustomUserChangeForm
-from .models import User, Category, SubCategory, Quiz, Question, QuizHistory
+from .models import User, Category, SubCategory, Quiz, Question, QuizHistory, GenerationJob, UserBadge, PinnedAnswer
 
 
 # ---------------- User Admin ---------------- #
@@ -66,6 +66,28 @@ class QuizHistoryAdmin(admin.ModelAdmin):
     list_filter = ["quiz", "user"]
 
 
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "user", "count", "ready", "status", "created_at", "updated_at"]
+    search_fields = ["user__email"]
+    list_filter = ["status"]
+    readonly_fields = ["error"]
+
+
+@admin.register(PinnedAnswer)
+class PinnedAnswerAdmin(admin.ModelAdmin):
+    list_display = ["question", "is_active", "updated_at"]
+    search_fields = ["question", "answer"]
+    list_filter = ["is_active"]
+
+
+@admin.register(UserBadge)
+class UserBadgeAdmin(admin.ModelAdmin):
+    list_display = ["user", "code", "awarded_at"]
+    search_fields = ["user__email"]
+    list_filter = ["code"]
+
+
 # ---------------- Register Custom User ---------------- #
 admin.site.register(User, UserAdmin)
 admin.site.unregister(Group)
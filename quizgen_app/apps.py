@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QuizgenAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quizgen_app'
+
+    def ready(self):
+        from .services import badges, instrumentation, llm_client, page_cache, sqlite  # noqa: F401  (connect their signal receivers)
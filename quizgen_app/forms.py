@@ -3,6 +3,7 @@ from django.contrib.auth.forms import ReadOnlyPasswordHashField, AuthenticationF
 from django.core.exceptions import ValidationError
 from .models import User
 from .models import Profile
+from .models import Category, SubCategory, Quiz
 
 # ---------------- User Forms ---------------- #
 class CustomUserCreationForm(forms.ModelForm):
@@ -77,4 +78,30 @@ class ProfileForm(forms.ModelForm):
             "avatar": forms.FileInput(attrs={
                 "class": "w-full text-sm text-gray-600"
             }),
-        }
\ No newline at end of file
+        }
+
+
+# ---------------- History Filters ---------------- #
+FILTER_CLASS = "px-4 py-2 border rounded-lg shadow-sm focus:outline-none focus:ring-2 focus:ring-blue-500"
+
+
+class HistoryFilterForm(forms.Form):
+    """GET filters for the history page (all optional)."""
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.all(), required=False, empty_label="All Categories",
+        widget=forms.Select(attrs={"class": FILTER_CLASS, "onchange": "this.form.submit()"}),
+    )
+    subcategory = forms.ModelChoiceField(
+        queryset=SubCategory.objects.all(), required=False, empty_label="All Subcategories",
+        widget=forms.Select(attrs={"class": FILTER_CLASS, "onchange": "this.form.submit()"}),
+    )
+    difficulty = forms.ChoiceField(
+        choices=[("", "All Difficulty")] + Quiz.DIFFICULTY_CHOICES, required=False,
+        widget=forms.Select(attrs={"class": FILTER_CLASS, "onchange": "this.form.submit()"}),
+    )
+    date_from = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={"type": "date", "class": FILTER_CLASS}),
+    )
+    date_to = forms.DateField(
+        required=False, widget=forms.DateInput(attrs={"type": "date", "class": FILTER_CLASS}),
+    )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quizgen_app.services.badges import backfill_badges
+
+
+class Command(BaseCommand):
+    help = "Award badges earned before the badge engine existed (run rebuild_user_stats first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users, awarded = backfill_badges(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Checked {users} users, awarded {awarded} badges"))
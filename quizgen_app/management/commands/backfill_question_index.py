@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quizgen_app.models import Question, QuestionFingerprint
+from quizgen_app.services.dedup import index_questions
+
+
+class Command(BaseCommand):
+    help = "Build near-duplicate index rows for questions that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--rebuild", action="store_true", help="Drop the whole index first.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["rebuild"]:
+            QuestionFingerprint.objects.all().delete()
+
+        started = time.monotonic()
+        indexed = 0
+        last_id = 0
+        while True:
+            # Keyset over the primary key so every batch is an index range scan.
+            batch = list(
+                Question.objects
+                .filter(id__gt=last_id, fingerprint__isnull=True)
+                .order_by("id")
+                .only("id", "quiz_id", "text")[:batch_size]
+            )
+            if not batch:
+                break
+            with transaction.atomic():
+                index_questions(batch)
+            last_id = batch[-1].id
+            indexed += len(batch)
+            self.stdout.write(f"Indexed {indexed} questions (up to id {last_id})")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Done: {indexed} questions in {elapsed:.1f}s"))
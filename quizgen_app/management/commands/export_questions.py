@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizgen_app.models import Question
+from quizgen_app.services.question_io import DIFFICULTIES, FORMATS, detect_format, export_rows, open_text, write_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the question bank as JSON lines or CSV (see services/question_io.py), "
+        "streamed in id order. A .gz path is gzipped; '-' writes to stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Output file, default stdout.")
+        parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension, else jsonl.")
+        parser.add_argument("--category", action="append", help="Category name, repeatable; default all.")
+        parser.add_argument("--difficulty", action="append", choices=sorted(DIFFICULTIES))
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rows fetched per round trip.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        questions = Question.objects.all()
+        if options["category"]:
+            questions = questions.filter(quiz__category__name__in=options["category"])
+        if options["difficulty"]:
+            questions = questions.filter(quiz__difficulty__in=options["difficulty"])
+
+        started = time.monotonic()
+        f = open_text(path, "w")
+        try:
+            count = write_records(export_rows(questions, options["batch_size"]), f, detect_format(path, options["format"]))
+        finally:
+            if path == "-":
+                f.flush()
+            else:
+                f.close()
+
+        elapsed = time.monotonic() - started
+        # With the data on stdout the summary goes to stderr.
+        out = self.stderr if path == "-" else self.stdout
+        out.write(self.style.SUCCESS(f"Exported {count} questions in {elapsed:.1f}s"))
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quizgen_app.models import Question
+from quizgen_app.services.question_io import FORMATS, Importer, RecordError, detect_format, open_text, read_records
+
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Import questions from JSON lines or CSV (the export_questions format) into the bank "
+        "pools, creating categories, subcategories and pool quizzes as needed. Questions "
+        "already in their pool (same normalized text) are skipped, or updated with --upsert. "
+        "Each batch commits on its own, so an interrupted import can simply be run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file; '-' reads stdin, a .gz path is gunzipped.")
+        parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension, else jsonl.")
+        parser.add_argument("--upsert", action="store_true", help="Overwrite options / answer of existing questions.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Records per transaction.")
+        parser.add_argument("--progress", type=int, default=50000, help="Report every N records; 0 for never.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        path = options["path"]
+        if Question.objects.filter(fingerprint__isnull=True).exists():
+            # Skipping / upserting matches on the fingerprint index.
+            self.stderr.write(self.style.WARNING(
+                "Some questions have no fingerprint yet; run backfill_question_index first "
+                "or their copies in the file will be imported again."
+            ))
+
+        importer = Importer(upsert=options["upsert"], batch_size=options["batch_size"])
+        started = time.monotonic()
+        read = invalid = 0
+        try:
+            f = open_text(path, "r")
+        except OSError as e:
+            raise CommandError(e)
+        try:
+            for line_no, record in read_records(f, detect_format(path, options["format"])):
+                read += 1
+                try:
+                    importer.add(record)
+                except RecordError as e:
+                    invalid += 1
+                    if invalid <= MAX_REPORTED_ERRORS:
+                        self.stderr.write(f"line {line_no}: {e}")
+                if options["progress"] and read % options["progress"] == 0:
+                    self.stdout.write(f"{read} records, {read / (time.monotonic() - started):.0f}/s")
+            importer.flush()
+        finally:
+            if path != "-":
+                f.close()
+
+        elapsed = time.monotonic() - started
+        stats = importer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {read} records in {elapsed:.1f}s ({read / elapsed if elapsed else 0:.0f}/s): "
+            f"{stats['created']} created, {stats['updated']} updated, "
+            f"{stats['skipped'] + stats['unchanged']} already present, "
+            f"{stats['duplicates']} repeated in the file, {invalid} invalid; "
+            f"{stats['categories_created']} categories and {stats['subcategories_created']} subcategories created"
+        ))
@@ -0,0 +1,318 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from quizgen_app.services.metrics import percentile_ms
+
+# Category / subcategory ids as categories.html embeds them for its JS.
+CATEGORY_BLOCK = re.compile(r'id: "(\d+)",\s*subs: \[(.*?)\]', re.S)
+SUBCATEGORY_ID = re.compile(r'\{id: "(\d+)"')
+JOB_URL = re.compile(r"/quiz/job/(\d+)/")
+TOTAL = re.compile(r"let total = (\d+);")
+
+# Status codes each step counts as success; anything else is an error.
+EXPECTED = {
+    "register": {302},
+    "login": {302},
+    "categories": {200},
+    "start": {302},
+    "play": {200},
+    "questions": {200, 304},   # 304: an unchanged window, revalidated by ETag
+    "job_status": {200},
+    "submit": {200},
+    "dashboard": {200},
+}
+
+
+class FlowError(Exception):
+    pass
+
+
+class Recorder:
+    """Latency samples and status codes per step, shared by all virtual users."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = defaultdict(int)
+        self.messages = Counter()
+        self.flows = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, step, elapsed, status=None, error=None):
+        with self._lock:
+            self.latencies[step].append(elapsed)
+            self.statuses[step][str(status or "exception")] += 1
+            if error:
+                self.errors[step] += 1
+                self.messages[f"{step}: {error}"] += 1
+
+    def flow(self, outcome):
+        with self._lock:
+            self.flows[outcome] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        for step in EXPECTED:
+            samples = self.latencies.get(step)
+            if not samples:
+                continue
+            endpoints[step] = {
+                "requests": len(samples),
+                "errors": self.errors[step],
+                "error_rate": round(self.errors[step] / len(samples), 4),
+                "throughput_rps": round(len(samples) / duration, 2),
+                "p50_ms": percentile_ms(samples, 50),
+                "p95_ms": percentile_ms(samples, 95),
+                "p99_ms": percentile_ms(samples, 99),
+                "max_ms": round(max(samples) * 1000, 2),
+                "status": dict(sorted(self.statuses[step].items())),
+            }
+        requests = sum(e["requests"] for e in endpoints.values())
+        errors = sum(e["errors"] for e in endpoints.values())
+        return {
+            "duration_s": round(duration, 2),
+            "requests": requests,
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else 0,
+            "throughput_rps": round(requests / duration, 2),
+            "flows_completed": self.flows["completed"],
+            "flows_failed": self.flows["failed"],
+            "flows_per_s": round(self.flows["completed"] / duration, 2),
+            "endpoints": endpoints,
+            "top_errors": dict(self.messages.most_common(10)),
+        }
+
+
+class VirtualUser:
+    """One browser-like client: its own cookies, working through the quiz flow."""
+
+    def __init__(self, base_url, recorder, options, rng):
+        self.http = httpx.Client(base_url=base_url, timeout=options["timeout"], follow_redirects=False)
+        self.recorder = recorder
+        self.options = options
+        self.rng = rng
+        self.email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        self.password = "Load-test-pw-42"
+        self.windows = {}   # url -> (ETag, body), the browser's HTTP cache
+
+    def request(self, step, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.add(step, time.perf_counter() - started, error=type(e).__name__)
+            raise FlowError(f"{step}: {type(e).__name__}") from e
+        elapsed = time.perf_counter() - started
+        if response.status_code not in EXPECTED[step]:
+            self.recorder.add(step, elapsed, response.status_code, error=f"HTTP {response.status_code}")
+            raise FlowError(f"{step}: HTTP {response.status_code}")
+        self.recorder.add(step, elapsed, response.status_code)
+        return response
+
+    def fetch_window(self, start):
+        """One /quiz/questions/ window, revalidated with If-None-Match like a browser fetch."""
+        url = f"/quiz/questions/?start={start}&limit={self.options['window']}"
+        cached = self.windows.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self.request("questions", "GET", url, headers=headers)
+        if response.status_code == 304:
+            return cached[1]
+        data = response.json()
+        self.windows[url] = (response.headers.get("ETag"), data)
+        return data
+
+    def post_form(self, step, url, data):
+        # Django's CSRF check wants the cookie value echoed back in the form.
+        data = {**data, "csrfmiddlewaretoken": self.http.cookies.get("csrftoken", "")}
+        return self.request(step, "POST", url, data=data, headers={"Referer": str(self.http.base_url)})
+
+    def sign_up(self):
+        try:
+            self.http.get("/register/")   # sets the CSRF cookie; not timed
+        except httpx.HTTPError as e:
+            raise FlowError(f"register: {type(e).__name__}") from e
+        self.post_form("register", "/register/", {
+            "email": self.email, "password1": self.password, "password2": self.password,
+        })
+        self.post_form("login", "/login/", {"username": self.email, "password": self.password})
+
+    def play_quiz(self):
+        page = self.request("categories", "GET", "/categories/").text
+        pairs = [
+            (cat_id, sub_id)
+            for cat_id, subs in CATEGORY_BLOCK.findall(page)
+            for sub_id in SUBCATEGORY_ID.findall(subs)
+        ]
+        if not pairs:
+            raise FlowError("categories: no subcategories to start a quiz in")
+        cat_id, sub_id = self.rng.choice(pairs)
+
+        level, count = self.options["level"], self.options["count"]
+        self.request("start", "GET", f"/start/{cat_id}/{sub_id}/{level}/{count}/")
+        play = self.request("play", "GET", "/quiz/play/").text
+        job_url, total = JOB_URL.search(play), TOTAL.search(play)
+        if not job_url or not total:
+            raise FlowError("play: no quiz in progress")
+        job_id, total = job_url.group(1), int(total.group(1))
+
+        # Walk the attempt a window at a time, as quiz_play.html does; a window
+        # still being generated is polled until it fills up or the job ends.
+        self.windows.clear()
+        window = self.options["window"]
+        answers = {}
+        start = 0
+        deadline = time.monotonic() + self.options["timeout"]
+        while start < total:
+            data = self.fetch_window(start)
+            total = data["total"]   # drops to what is ready if the job came up short
+            for question in data["questions"]:
+                answers.setdefault(str(question["index"]), self.rng.choice("ABCD"))
+            if len(data["questions"]) >= min(window, total - start):
+                start += window
+                continue
+            if data["status"] == "failed":
+                raise FlowError("questions: job failed")
+            if time.monotonic() > deadline:
+                raise FlowError("questions: still pending at the deadline")
+            time.sleep(self.options["poll"])
+
+        # Submit only counts once the job is done, same as the player page.
+        while True:
+            status = self.request("job_status", "GET", f"/quiz/job/{job_id}/").json()
+            if status["status"] == "done":
+                break
+            if status["status"] == "failed" or time.monotonic() > deadline:
+                raise FlowError(f"job_status: {status['status']}")
+            time.sleep(self.options["poll"])
+
+        # 200 is only the result page; a submit that did not count redirects.
+        self.post_form("submit", "/quiz/submit/", answers)
+        self.request("dashboard", "GET", "/dashboard/")
+
+    def run(self, stop_at, iterations):
+        try:
+            self.sign_up()
+        except FlowError:
+            self.recorder.flow("failed")
+            self.http.close()
+            return
+        done = 0
+        while (iterations is None or done < iterations) and (stop_at is None or time.monotonic() < stop_at):
+            try:
+                self.play_quiz()
+                self.recorder.flow("completed")
+            except FlowError:
+                self.recorder.flow("failed")
+            done += 1
+        self.http.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test: virtual users register, log in, open categories, start a quiz, fetch "
+        "its question windows, submit and load the dashboard over HTTP. Reports throughput, "
+        "p50/p95/p99 latency and error rates per endpoint as JSON. Without --base-url an "
+        "in-process server is started with the fake LLM provider, against the configured "
+        "database - point DATABASE_URL at a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", help="Server to test, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users.")
+        parser.add_argument("--iterations", type=int, default=1, help="Quizzes per user.")
+        parser.add_argument("--duration", type=float, help="Seconds to run; overrides --iterations.")
+        parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which users start.")
+        parser.add_argument("--count", type=int, default=5, help="Questions per quiz.")
+        parser.add_argument("--window", type=int, default=10, help="Questions per /quiz/questions/ request.")
+        parser.add_argument("--level", default="easy")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per request and per quiz, seconds.")
+        parser.add_argument("--poll", type=float, default=0.25, help="Max wait between pending polls.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        server = nullcontext(options["base_url"]) if options["base_url"] else self.in_process_server()
+        with server as base_url:
+            report = self.run(base_url, options)
+
+        report["config"] = {
+            key: options[key]
+            for key in ("users", "iterations", "duration", "ramp_up", "count", "window", "level", "seed")
+        }
+        report["config"]["base_url"] = options["base_url"] or "in-process (fake LLM provider)"
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(
+            f"{report['requests']} requests in {report['duration_s']}s: {report['throughput_rps']} req/s, "
+            f"{report['flows_completed']} quizzes completed, {report['flows_failed']} failed, "
+            f"error rate {report['error_rate']:.2%}"
+        )
+        for step, e in report["endpoints"].items():
+            self.stdout.write(
+                f"{step:>11}: {e['requests']:>6} req  {e['throughput_rps']:>8} req/s  "
+                f"p50/p95/p99 {e['p50_ms']}/{e['p95_ms']}/{e['p99_ms']} ms  errors {e['error_rate']:.2%}"
+            )
+
+    @contextmanager
+    def in_process_server(self):
+        """Serve this project on a free port with the fake LLM provider; yields the base URL."""
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        # override_settings sends setting_changed, which drops any cached LLM client
+        fake = {**getattr(settings, "QUIZ_LLM_PROVIDER", {}), "BACKEND": "fake"}
+        with override_settings(QUIZ_LLM_PROVIDER=fake, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "127.0.0.1"]):
+            server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+            server.set_app(get_internal_wsgi_application())
+            threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+            try:
+                yield f"http://127.0.0.1:{server.server_address[1]}"
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def run(self, base_url, options):
+        if options["users"] < 1:
+            raise CommandError("--users must be at least 1")
+        if options["window"] < 1:
+            raise CommandError("--window must be at least 1")
+        recorder = Recorder()
+        rng = random.Random(options["seed"])
+        stop_at = time.monotonic() + options["duration"] if options["duration"] else None
+        iterations = None if options["duration"] else options["iterations"]
+        users = [
+            VirtualUser(base_url, recorder, options, random.Random(rng.random()))
+            for _ in range(options["users"])
+        ]
+
+        def start(i, user):
+            time.sleep(options["ramp_up"] * i / len(users))
+            user.run(stop_at, iterations)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=start, args=(i, user)) for i, user in enumerate(users)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return recorder.report(time.monotonic() - started)
@@ -0,0 +1,232 @@
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+
+from quizgen_app.models import Quiz, SubCategory
+from quizgen_app.services.admission import TokenBucket
+from quizgen_app.services.question_bank import get_bank_quiz, get_pool_limits, top_up
+
+DIFFICULTIES = [value for value, _ in Quiz.DIFFICULTY_CHOICES]
+
+# Top-ups in a row that add nothing (all duplicates / failures) before a pool is given up on.
+MAX_STALLS = 3
+
+
+class CallBudget:
+    """
+    LLM calls the run may make: ``rate`` per minute on average (0: no limit)
+    and ``total`` overall (None: no limit). Shared by all workers.
+    """
+
+    def __init__(self, rate, total, burst, stop):
+        self.bucket = TokenBucket(rate / 60, burst)
+        self.total = total
+        self.spent = 0
+        self.stop = stop
+        self._lock = threading.Lock()
+
+    def spend(self, calls):
+        """Wait for ``calls`` calls' worth of rate; False if the budget is used up or the run stops."""
+        with self._lock:
+            if self.total is not None and self.spent + calls > self.total:
+                return False
+            self.spent += calls
+        while True:
+            wait = self.bucket.take("prewarm", calls)
+            if not wait:
+                return True
+            if self.stop.wait(wait):
+                return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the question bank: every category x subcategory x difficulty pool is topped up "
+        "from the LLM to --target questions, --workers pools at a time, within an LLM call "
+        "rate and budget. Pools already at the target are skipped, so an interrupted run "
+        "resumes where it stopped when started again. Meant for deploys and a nightly job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target", type=int,
+            help="Questions per pool (default QUIZ_BANK_MIN_POOL; never above QUIZ_BANK_MAX_POOL).",
+        )
+        parser.add_argument("--difficulty", action="append", choices=DIFFICULTIES, help="Repeatable; default all.")
+        parser.add_argument("--category", action="append", help="Category name, repeatable; default all.")
+        parser.add_argument("--workers", type=int, default=4, help="Pools filled concurrently.")
+        parser.add_argument("--batch", type=int, default=10, help="Questions asked for per top-up.")
+        parser.add_argument("--rate", type=float, default=60, help="LLM calls per minute; 0 for no limit.")
+        parser.add_argument("--budget", type=int, help="Stop after this many LLM calls.")
+        parser.add_argument("--dry-run", action="store_true", help="Only list what would be generated.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["batch"] < 1:
+            raise CommandError("--workers and --batch must be at least 1")
+        min_pool, max_pool = get_pool_limits()
+        target = min(options["target"] or min_pool, max_pool)
+
+        combos = self.plan(options["category"], options["difficulty"] or DIFFICULTIES, target)
+        todo = [c for c in combos if c["before"] < target]
+        if not options["json"]:
+            self.stdout.write(
+                f"{len(combos)} pools, {len(combos) - len(todo)} already at {target}, "
+                f"{sum(target - c['before'] for c in todo)} questions to generate"
+            )
+        if options["dry_run"]:
+            for c in todo:
+                self.stdout.write(f"{c['name']}: {c['before']}/{target}")
+            return
+
+        started = time.monotonic()
+        results = self.run(todo, target, options)
+        elapsed = time.monotonic() - started
+
+        added = sum(r["added"] for r in results)
+        report = {
+            "target": target,
+            "pools": len(combos),
+            "skipped": len(combos) - len(todo),
+            "filled": sum(r["status"] == "done" for r in results),
+            "incomplete": sum(r["status"] != "done" for r in results),
+            "not_started": len(todo) - len(results),
+            "questions_added": added,
+            "llm_calls": sum(r["calls"] for r in results),
+            "duration_s": round(elapsed, 2),
+            "questions_per_s": round(added / elapsed, 2) if elapsed else 0,
+            "results": results,
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        summary = (
+            f"Done: +{added} questions in {report['duration_s']}s ({report['questions_per_s']} q/s, "
+            f"{report['llm_calls']} LLM calls); {report['filled']} pools filled, "
+            f"{report['incomplete']} incomplete, {report['not_started']} not started"
+        )
+        if report["incomplete"] or report["not_started"]:
+            self.stdout.write(self.style.WARNING(summary + " - run again to resume"))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def plan(self, categories, difficulties, target):
+        """Every (subcategory, difficulty) pool with its current size, emptiest first."""
+        subcategories = SubCategory.objects.select_related("category").order_by("category__name", "name")
+        if categories:
+            subcategories = subcategories.filter(category__name__in=categories)
+
+        # Pool size of each bank quiz (one per (subcategory, difficulty)), in
+        # one query instead of one per pool.
+        quizzes = (
+            Quiz.objects
+            .filter(subcategory__isnull=False, difficulty__in=difficulties)
+            .annotate(size=Count("questions"))
+            .values_list("subcategory_id", "difficulty", "size")
+        )
+        sizes = {(subcategory_id, difficulty): size for subcategory_id, difficulty, size in quizzes}
+
+        combos = [
+            {
+                "subcategory": sub,
+                "difficulty": difficulty,
+                "name": f"{sub.category.name} / {sub.name} / {difficulty}",
+                "before": sizes.get((sub.id, difficulty), 0),
+            }
+            for sub in subcategories
+            for difficulty in difficulties
+        ]
+        # New subcategories first: their users are the ones waiting on the LLM.
+        return sorted(combos, key=lambda c: c["before"])
+
+    def run(self, todo, target, options):
+        stop = threading.Event()
+        chunk_size = max(1, getattr(settings, "QUIZ_CHUNK_SIZE", 5))
+        burst = max(options["workers"], math.ceil(options["batch"] / chunk_size))
+        budget = CallBudget(options["rate"], options["budget"], burst, stop)
+        results = []
+        started = time.monotonic()
+
+        def fill(combo):
+            began = time.monotonic()
+            try:
+                return self.fill(combo, target, options["batch"], chunk_size, budget, stop)
+            except Exception as e:
+                return {**self.result(combo, combo["before"], 0, began), "status": f"error: {e}"}
+            finally:
+                # Worker threads end with the run; don't leave their persistent connections open
+                connections.close_all()
+
+        executor = ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix="prewarm")
+        futures = [executor.submit(fill, combo) for combo in todo]
+        reported = set()
+        try:
+            for future in as_completed(futures):
+                reported.add(future)
+                result = future.result()
+                results.append(result)
+                if options["json"]:
+                    continue
+                added = sum(r["added"] for r in results)
+                self.stdout.write(
+                    f"[{len(results)}/{len(todo)}] {result['name']}: {result['before']} -> "
+                    f"{result['after']} (+{result['added']}, {result['calls']} calls, "
+                    f"{result['seconds']}s) {result['status']}; "
+                    f"total {added / (time.monotonic() - started):.2f} q/s"
+                )
+        except KeyboardInterrupt:
+            # Pools in progress keep what they saved so far; the next run picks them up.
+            self.stderr.write("Interrupted, waiting for the running top-ups to finish...")
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            results.extend(f.result() for f in futures if f not in reported and f.done() and not f.cancelled())
+        else:
+            executor.shutdown()
+        return results
+
+    def fill(self, combo, target, batch, chunk_size, budget, stop):
+        started = time.monotonic()
+        sub, difficulty = combo["subcategory"], combo["difficulty"]
+        quiz = None
+        have = before = combo["before"]
+        calls = stalls = 0
+        status = "done"
+        while have < target:
+            wanted = min(target - have, batch)
+            cost = math.ceil(wanted / chunk_size)   # one LLM call per chunk, refill rounds aside
+            if stop.is_set() or not budget.spend(cost):
+                status = "stopped" if stop.is_set() else "out of budget"
+                break
+            if quiz is None:
+                # Only now, so pools the budget never reaches get no empty bank quiz.
+                quiz = get_bank_quiz(sub.category, sub, difficulty)
+                have = before = quiz.questions.count()
+                wanted = min(target - have, batch)
+                if wanted <= 0:
+                    break
+            calls += cost
+            added = len(top_up(quiz, wanted))
+            have += added
+            stalls = 0 if added else stalls + 1
+            if stalls >= MAX_STALLS:
+                status = "stalled"
+                break
+        return {**self.result(combo, before, have - before, started), "calls": calls, "status": status}
+
+    def result(self, combo, before, added, started):
+        return {
+            "name": combo["name"],
+            "before": before,
+            "after": before + added,
+            "added": added,
+            "calls": 0,
+            "seconds": round(time.monotonic() - started, 2),
+            "status": "done",
+        }
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from quizgen_app.models import User
+from quizgen_app.services.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute UserStats and UserCategoryStats from completed quiz history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", dest="emails", help="Only rebuild this user (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["emails"]:
+            user_ids = list(User.objects.filter(email__in=options["emails"]).values_list("id", flat=True))
+        users, categories = rebuild_stats(user_ids=user_ids, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {users} users ({categories} category rows)"))
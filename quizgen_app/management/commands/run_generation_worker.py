@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizgen_app.services.jobs import run_queued_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued quiz generation jobs (for QUIZ_JOB_RUNNER = 'external')."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--batch", type=int, default=10, help="Jobs to pick up per poll.")
+
+    def handle(self, *args, **options):
+        while True:
+            ran = run_queued_jobs(limit=options["batch"])
+            if ran:
+                self.stdout.write(f"Ran {ran} job(s)")
+            if options["once"] and not ran:
+                break
+            if not ran:
+                time.sleep(options["interval"])
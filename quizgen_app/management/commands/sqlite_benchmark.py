@@ -0,0 +1,142 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from quizgen_app.services.metrics import percentile_ms
+from quizgen_app.services.sqlite import pragma_statements
+
+SCHEMA = [
+    "CREATE TABLE history (id INTEGER PRIMARY KEY, user_id INTEGER, score REAL, completed_at REAL)",
+    "CREATE INDEX history_user ON history (user_id, completed_at)",
+    "CREATE TABLE stats (user_id INTEGER PRIMARY KEY, quiz_count INTEGER, score_sum REAL)",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency benchmark: submit-like writers and dashboard-like readers on a scratch "
+        "database, with Django's default SQLite settings and with SQLITE_PRAGMAS / BEGIN IMMEDIATE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per mode.")
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--mode", choices=["default", "production", "both"], default="both")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        modes = ["default", "production"] if options["mode"] == "both" else [options["mode"]]
+        report = {mode: self.run_mode(mode, options) for mode in modes}
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for mode, r in report.items():
+            self.stdout.write(
+                f"{mode:>10}: {r['writes_per_s']:>8} writes/s  {r['reads_per_s']:>8} reads/s  "
+                f"{r['lock_errors']:>5} lock errors  "
+                f"write p50/p95 {r['write_p50_ms']}/{r['write_p95_ms']} ms  "
+                f"read p50/p95 {r['read_p50_ms']}/{r['read_p95_ms']} ms"
+            )
+
+    def connect(self, path, mode):
+        # isolation_level=None: we issue BEGIN ourselves, like Django does.
+        if mode == "production":
+            pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+            conn = sqlite3.connect(path, timeout=pragmas.get("busy_timeout", 5000) / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            for statement in pragma_statements(pragmas):
+                conn.execute(statement)
+            return conn, "BEGIN IMMEDIATE"
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        return conn, "BEGIN"
+
+    def run_mode(self, mode, options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.sqlite3")
+            conn, _ = self.connect(path, mode)
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.executemany(
+                "INSERT INTO stats (user_id, quiz_count, score_sum) VALUES (?, 0, 0)",
+                [(u,) for u in range(options["users"])],
+            )
+            conn.close()
+
+            results = {"write": [], "read": [], "errors": 0}
+            lock = threading.Lock()
+            stop = time.monotonic() + options["duration"]
+
+            def worker(kind):
+                conn, begin = self.connect(path, mode)
+                rng = random.Random()
+                latencies = []
+                errors = 0
+                while time.monotonic() < stop:
+                    user_id = rng.randrange(options["users"])
+                    started = time.perf_counter()
+                    try:
+                        if kind == "write":
+                            # Shape of submit_quiz_view: read stats, insert history, update stats.
+                            conn.execute(begin)
+                            try:
+                                conn.execute("SELECT quiz_count, score_sum FROM stats WHERE user_id = ?", (user_id,)).fetchone()
+                                score = rng.random() * 100
+                                conn.execute(
+                                    "INSERT INTO history (user_id, score, completed_at) VALUES (?, ?, ?)",
+                                    (user_id, score, time.time()),
+                                )
+                                conn.execute(
+                                    "UPDATE stats SET quiz_count = quiz_count + 1, score_sum = score_sum + ? WHERE user_id = ?",
+                                    (score, user_id),
+                                )
+                                conn.execute("COMMIT")
+                            except Exception:
+                                conn.execute("ROLLBACK")
+                                raise
+                        else:
+                            # Shape of dashboard_view: stats row plus recent history.
+                            conn.execute("SELECT * FROM stats WHERE user_id = ?", (user_id,)).fetchone()
+                            conn.execute(
+                                "SELECT * FROM history WHERE user_id = ? ORDER BY completed_at DESC LIMIT 10",
+                                (user_id,),
+                            ).fetchall()
+                    except sqlite3.OperationalError as e:
+                        if "locked" not in str(e) and "busy" not in str(e):
+                            raise
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+                conn.close()
+                with lock:
+                    results[kind].extend(latencies)
+                    results["errors"] += errors
+
+            threads = (
+                [threading.Thread(target=worker, args=("write",)) for _ in range(options["writers"])]
+                + [threading.Thread(target=worker, args=("read",)) for _ in range(options["readers"])]
+            )
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        duration = options["duration"]
+        return {
+            "writes_per_s": round(len(results["write"]) / duration, 1),
+            "reads_per_s": round(len(results["read"]) / duration, 1),
+            "lock_errors": results["errors"],
+            "write_p50_ms": percentile_ms(results["write"], 50),
+            "write_p95_ms": percentile_ms(results["write"], 95),
+            "read_p50_ms": percentile_ms(results["read"], 50),
+            "read_p95_ms": percentile_ms(results["read"], 95),
+        }
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from quizgen_app.services.sqlite import checkpoint, optimize
+
+
+class Command(BaseCommand):
+    help = "Checkpoint the SQLite WAL and run PRAGMA optimize (once, or every --interval seconds)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--mode", default="TRUNCATE", choices=["PASSIVE", "FULL", "RESTART", "TRUNCATE"],
+            help="wal_checkpoint mode (TRUNCATE also shrinks the -wal file).",
+        )
+        parser.add_argument("--no-optimize", action="store_true", help="Only checkpoint.")
+        parser.add_argument("--interval", type=float, default=0, help="Repeat every N seconds (0 = run once).")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError(f"Database {options['database']!r} is not SQLite")
+
+        while True:
+            busy, wal_pages, moved = checkpoint(connection, options["mode"])
+            message = f"wal_checkpoint({options['mode']}): {moved}/{wal_pages} pages"
+            if busy:
+                message += " (busy, run again later)"
+            if not options["no_optimize"]:
+                optimize(connection)
+                message += ", optimize done"
+            self.stdout.write(message)
+
+            if not options["interval"]:
+                break
+            connection.close()   # don't pin a read snapshot between runs
+            time.sleep(options["interval"])
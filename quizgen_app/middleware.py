@@ -0,0 +1,40 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from .services import instrumentation
+
+
+class MetricsMiddleware:
+    """
+    Per-view latency and SQL totals for every request (services/instrumentation.py).
+    Put it first in MIDDLEWARE so the time spent in the other middleware counts
+    too. For streaming responses the time is to the first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not instrumentation.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = instrumentation.start_request()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        instrumentation.finish_request(token, request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        token = instrumentation.start_request()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        instrumentation.finish_request(token, request, response, started)
+        return response
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizgen_app', '0002_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionFingerprint',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='quizgen_app.question')),
+                ('text_hash', models.CharField(db_index=True, max_length=40)),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='quizgen_app.questionfingerprint')),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizgen_app', '0003_question_dedup_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='generationjob',
+            name='questions',
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='ready',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='AttemptQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('seed', models.PositiveIntegerField()),
+                ('history', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_questions', to='quizgen_app.quizhistory')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizgen_app.question')),
+            ],
+            options={
+                'ordering': ['position'],
+                'constraints': [models.UniqueConstraint(fields=('history', 'position'), name='unique_attempt_position')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:18
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizgen_app', '0004_attempt_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('quiz_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('correct_sum', models.PositiveIntegerField(default=0)),
+                ('total_sum', models.PositiveIntegerField(default=0)),
+                ('duration_sum', models.DurationField(default=datetime.timedelta)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_active', models.DateField(blank=True, null=True)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserCategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quiz_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('correct_sum', models.PositiveIntegerField(default=0)),
+                ('total_sum', models.PositiveIntegerField(default=0)),
+                ('duration_sum', models.DurationField(default=datetime.timedelta)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_stats', to='quizgen_app.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'category'), name='unique_user_category_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizgen_app', '0005_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBadge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=30)),
+                ('awarded_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='badges', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['awarded_at', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'code'), name='unique_user_badge')],
+            },
+        ),
+    ]
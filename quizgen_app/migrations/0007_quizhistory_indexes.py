@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizgen_app', '0006_user_badges'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizhistory',
+            index=models.Index(condition=models.Q(('completed_at__isnull', False)), fields=['user', '-completed_at', '-id'], name='quizhist_user_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizhistory',
+            index=models.Index(fields=['user', 'started_at'], name='quizhist_user_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizhistory',
+            index=models.Index(fields=['user', 'quiz'], name='quizhist_user_quiz_idx'),
+        ),
+    ]
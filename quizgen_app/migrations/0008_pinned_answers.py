@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizgen_app', '0007_quizhistory_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PinnedAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('question', models.CharField(max_length=255)),
+                ('answer', models.TextField()),
+                ('key', models.CharField(editable=False, max_length=40, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
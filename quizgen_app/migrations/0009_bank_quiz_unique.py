@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+def merge_duplicate_pools(apps, schema_editor):
+    """
+    Before the bank, every generated attempt got its own Quiz, so one
+    (subcategory, difficulty) can have many. Move their questions and
+    histories onto the oldest one, which get_bank_quiz already served from,
+    and drop the rest so the constraint can be added. backfill_question_index
+    indexes the moved questions for the duplicate filter.
+    """
+    Quiz = apps.get_model('quizgen_app', 'Quiz')
+    Question = apps.get_model('quizgen_app', 'Question')
+    QuizHistory = apps.get_model('quizgen_app', 'QuizHistory')
+
+    keepers = {}
+    duplicates = {}
+    rows = Quiz.objects.filter(subcategory__isnull=False).order_by('id')
+    for quiz_id, subcategory_id, difficulty in rows.values_list('id', 'subcategory_id', 'difficulty').iterator():
+        keeper = keepers.setdefault((subcategory_id, difficulty), quiz_id)
+        if keeper != quiz_id:
+            duplicates.setdefault(keeper, []).append(quiz_id)
+    for keeper, extra in duplicates.items():
+        Question.objects.filter(quiz_id__in=extra).update(quiz_id=keeper)
+        QuizHistory.objects.filter(quiz_id__in=extra).update(quiz_id=keeper)
+        Quiz.objects.filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizgen_app', '0008_pinned_answers'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_pools, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quiz',
+            constraint=models.UniqueConstraint(condition=models.Q(('subcategory__isnull', False)), fields=('subcategory', 'difficulty'), name='unique_bank_quiz'),
+        ),
+    ]
@@ -4,6 +4,7 @@ from .manager import UserManager
 from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from datetime import timedelta
 
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(
@@ -70,6 +71,16 @@ class Quiz(BaseModel):
     subcategory = models.ForeignKey(SubCategory, related_name='quizzes', on_delete=models.CASCADE, null=True, blank=True)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default="easy")  # 👈 Add this
 
+    class Meta:
+        constraints = [
+            # One bank pool per (subcategory, difficulty), see services/question_bank.py
+            models.UniqueConstraint(
+                fields=["subcategory", "difficulty"],
+                condition=models.Q(subcategory__isnull=False),
+                name="unique_bank_quiz",
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -97,6 +108,18 @@ class Question(BaseModel):
         return self.text
 
 
+class QuestionFingerprint(models.Model):
+    """Near-duplicate index entry for a Question (see services/dedup.py)."""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    text_hash = models.CharField(max_length=40, db_index=True)
+    minhash = models.BinaryField()
+
+
+class QuestionLSHBucket(models.Model):
+    fingerprint = models.ForeignKey(QuestionFingerprint, on_delete=models.CASCADE, related_name='buckets')
+    bucket = models.BigIntegerField(db_index=True)
+
+
 class QuizHistory(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_histories')
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='quiz_histories')
@@ -106,6 +129,36 @@ class QuizHistory(BaseModel):
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # History / dashboard / profile lists and stats rebuilds only look at completed attempts.
+            models.Index(
+                fields=["user", "-completed_at", "-id"],
+                condition=models.Q(completed_at__isnull=False),
+                name="quizhist_user_done_idx",
+            ),
+            models.Index(fields=["user", "started_at"], name="quizhist_user_started_idx"),
+            # Per-quiz lookups (seen questions, category / subcategory filters join through quiz).
+            models.Index(fields=["user", "quiz"], name="quizhist_user_quiz_idx"),
+        ]
+
+
+class AttemptQuestion(models.Model):
+    """
+    Position ``position`` of a quiz attempt: which bank question is shown
+    there and the seed of its option permutation (see question_bank.present_question).
+    """
+    history = models.ForeignKey(QuizHistory, on_delete=models.CASCADE, related_name='attempt_questions')
+    position = models.PositiveIntegerField()
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    seed = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(fields=["history", "position"], name="unique_attempt_position"),
+        ]
+
 
 class UserAnswer(BaseModel):
     ANSWER_CHOICES = [
@@ -120,6 +173,97 @@ class UserAnswer(BaseModel):
     selected_option = models.CharField(choices=ANSWER_CHOICES, max_length=1)
     is_correct = models.BooleanField(default=False)
 
+
+class GenerationJob(BaseModel):
+    """Background generation of the questions for one quiz attempt."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generation_jobs')
+    history = models.OneToOneField(QuizHistory, on_delete=models.CASCADE, related_name='generation_job')
+    count = models.PositiveIntegerField(default=5)
+    ready = models.PositiveIntegerField(default=0)  # AttemptQuestion rows written so far
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
+
+
+class StatsBase(models.Model):
+    """Running totals over a user's completed quizzes, kept up to date by services/stats.py."""
+    quiz_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    best_score = models.FloatField(default=0)
+    correct_sum = models.PositiveIntegerField(default=0)
+    total_sum = models.PositiveIntegerField(default=0)
+    duration_sum = models.DurationField(default=timedelta)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def avg_score(self):
+        return self.score_sum / self.quiz_count if self.quiz_count else 0
+
+
+class UserStats(StatsBase):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    last_active = models.DateField(null=True, blank=True)
+    current_streak = models.PositiveIntegerField(default=0)
+
+
+class UserCategoryStats(StatsBase):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='user_stats')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "category"], name="unique_user_category_stats"),
+        ]
+
+
+class UserBadge(models.Model):
+    """A badge awarded to a user. ``code`` is a key of services.badges.BADGES."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='badges')
+    code = models.CharField(max_length=30)
+    awarded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["awarded_at", "id"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "code"], name="unique_user_badge"),
+        ]
+
+    def __str__(self):
+        return f"{self.code} ({self.user_id})"
+
+
+class PinnedAnswer(BaseModel):
+    """Canonical chatbot answer for an FAQ, served instead of asking the LLM."""
+    question = models.CharField(max_length=255)
+    answer = models.TextField()
+    # Normalized question hash, see services/chat_cache.message_key
+    key = models.CharField(max_length=40, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+
+    def save(self, *args, **kwargs):
+        from .services.chat_cache import message_key
+        self.key = message_key(self.question)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.question
+
+
 class Profile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profile")
     full_name = models.CharField(max_length=150, blank=True, null=True)
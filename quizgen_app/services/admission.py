@@ -0,0 +1,254 @@
+"""
+Admission control for LLM-backed work.
+
+Two limits, both per process and configured by ``settings.QUIZ_ADMISSION``:
+
+* ``ConcurrencyLimiter`` - at most MAX_CONCURRENT LLM calls in flight, with up
+  to MAX_QUEUE more waiting in FIFO order for at most QUEUE_TIMEOUT seconds.
+  Every call made through the async LLM client takes a slot (streams hold it
+  until they are exhausted or closed); a call that finds the queue full, or
+  waits too long, is shed with ``AdmissionRejected`` (503).
+* ``TokenBucket`` - each user (or client IP, for anonymous chat) may start
+  USER_BURST LLM-backed requests at once, refilled at USER_RATE per second.
+  Views check it before doing any work and answer 429 when it is empty.
+  Quiz generation, whose LLM calls run later in a job, is also refused up
+  front while the limiter queue is full.
+
+Both rejections carry a ``Retry-After`` estimate; see ``rejection_response``.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.http import HttpResponse, JsonResponse
+from django.test.signals import setting_changed
+
+from .metrics import register_collector
+
+DEFAULTS = {
+    "MAX_CONCURRENT": 32,
+    "MAX_QUEUE": 64,
+    "QUEUE_TIMEOUT": 10.0,
+    "USER_RATE": 0.2,
+    "USER_BURST": 5,
+}
+
+
+class AdmissionRejected(Exception):
+    """A request or LLM call was shed. ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+
+class ConcurrencyLimiter:
+    """
+    A counting semaphore with a bounded FIFO queue that works across event
+    loops and threads: ASGI request loops and the shared LLM loop draw from
+    the same slots. A released slot is handed straight to the oldest waiter.
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.counters = {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+        self._waiters = deque()
+        self._avg_hold = 1.0   # seconds a call keeps its slot (moving average)
+        self._lock = threading.Lock()
+
+    def _retry_after(self):
+        # Time until the back of the queue would start. Call with the lock held.
+        return self._avg_hold * (len(self._waiters) + 1) / self.max_concurrent
+
+    async def acquire(self):
+        with self._lock:
+            if self.in_flight < self.max_concurrent and not self._waiters:
+                self.in_flight += 1
+                self.counters["admitted"] += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.counters["rejected_queue_full"] += 1
+                raise AdmissionRejected("Too many LLM requests queued", 503, self._retry_after())
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+            self.counters["queued"] += 1
+
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.counters["rejected_timeout"] += 1
+                        retry_after = self._retry_after()
+            if not granted:
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                raise AdmissionRejected("Timed out waiting for an LLM slot", 503, retry_after) from None
+            # The slot was handed over just as we gave up on it.
+            if isinstance(e, asyncio.CancelledError):
+                self.release()
+                raise
+        with self._lock:
+            self.counters["admitted"] += 1
+
+    def check_queue(self):
+        """Raise AdmissionRejected (503) now if a new call would find the queue full."""
+        with self._lock:
+            if len(self._waiters) >= self.max_queue:
+                self.counters["rejected_queue_full"] += 1
+                raise AdmissionRejected("Too many LLM requests queued", 503, self._retry_after())
+
+    def release(self, held=None):
+        with self._lock:
+            if held is not None:
+                self._avg_hold += 0.2 * (held - self._avg_hold)
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+                except RuntimeError:   # its event loop is gone
+                    continue
+                waiter.granted = True
+                return
+            self.in_flight -= 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "avg_hold_seconds": round(self._avg_hold, 3),
+            }
+
+
+class TokenBucket:
+    """One bucket per key: ``rate`` tokens per second, holding at most ``burst``."""
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.limited = 0
+        self._buckets = {}   # key -> (tokens, monotonic time of last update)
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1):
+        """Spend ``cost`` tokens of ``key``'s bucket. Returns 0, or seconds to wait if it is short."""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            if tokens < cost:
+                self._buckets[key] = (tokens, now)
+                self.limited += 1
+                return (cost - tokens) / self.rate
+            self._buckets[key] = (tokens - cost, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return 0
+
+    def _prune(self, now):
+        # A bucket untouched for this long is full again, same as a missing one.
+        refill = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < refill}
+
+    def metrics(self):
+        with self._lock:
+            return {"rate_limited": self.limited, "tracked_keys": len(self._buckets)}
+
+
+_limiter = None
+_buckets = None
+_lock = threading.Lock()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "QUIZ_ADMISSION", {})}
+
+
+def _metrics():
+    return {**get_limiter().metrics(), **get_user_buckets().metrics()}
+
+
+def get_limiter():
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            config = _config()
+            _limiter = ConcurrencyLimiter(config["MAX_CONCURRENT"], config["MAX_QUEUE"], config["QUEUE_TIMEOUT"])
+            register_collector("admission", _metrics)
+        return _limiter
+
+
+def get_user_buckets():
+    global _buckets
+    with _lock:
+        if _buckets is None:
+            config = _config()
+            _buckets = TokenBucket(config["USER_RATE"], config["USER_BURST"])
+            register_collector("admission", _metrics)
+        return _buckets
+
+
+@receiver(setting_changed, dispatch_uid="admission_settings_changed")
+def reset_limits(setting, **kwargs):
+    """Rebuild the limiter and the user buckets after override_settings touches QUIZ_ADMISSION."""
+    global _limiter, _buckets
+    if setting == "QUIZ_ADMISSION":
+        with _lock:
+            _limiter = _buckets = None
+
+
+def client_key(request, user):
+    if user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def check_user(key, cost=1):
+    """Raise AdmissionRejected (429) if ``key`` is over its request rate."""
+    wait = get_user_buckets().take(key, cost)
+    if wait:
+        raise AdmissionRejected("Too many requests, slow down", 429, wait)
+
+
+def rejection_response(exc, as_json=True):
+    if as_json:
+        response = JsonResponse({"error": str(exc), "retry_after": exc.retry_after}, status=exc.status)
+    else:
+        response = HttpResponse(
+            f"{exc}. Please try again in {exc.retry_after} seconds.",
+            status=exc.status, content_type="text/plain",
+        )
+    response["Retry-After"] = str(exc.retry_after)
+    return response
@@ -0,0 +1,131 @@
+"""
+Badge rules and awards.
+
+Each rule is registered with ``@badge(...)`` and looks only at a
+BadgeContext (the user's UserStats row plus a couple of counts), so all
+rules are evaluated together once per completed quiz, on the
+``quiz_completed`` signal, and the result is stored as UserBadge rows.
+Pages just read the awarded rows. ``manage.py backfill_badges`` evaluates
+the same rules for existing users.
+"""
+from collections import namedtuple
+
+from django.db.models import Count
+from django.dispatch import receiver
+
+from ..models import QuizHistory, UserBadge, UserCategoryStats, UserStats
+from ..signals import quiz_completed
+
+Badge = namedtuple("Badge", ["code", "icon", "name", "description", "rule"])
+BadgeContext = namedtuple("BadgeContext", ["stats", "categories_attempted", "completed_hard"])
+
+BADGES = {}
+
+
+def badge(code, icon, name, description):
+    """Register the decorated ``rule(ctx) -> bool`` as badge ``code``."""
+    def register(rule):
+        BADGES[code] = Badge(code, icon, name, description, rule)
+        return rule
+    return register
+
+
+@badge("first_quiz", "⭐", "First Quiz", "Completed your first quiz")
+def _first_quiz(ctx):
+    return ctx.stats.quiz_count >= 1
+
+
+@badge("high_scorer", "🏆", "High Scorer", "Scored above 90%")
+def _high_scorer(ctx):
+    return ctx.stats.best_score >= 90
+
+
+@badge("consistent", "🎯", "Consistent", "Maintained 70%+ average")
+def _consistent(ctx):
+    return ctx.stats.quiz_count >= 1 and ctx.stats.avg_score >= 70
+
+
+@badge("streak_master", "🔥", "Streak Master", "Kept a 3-day streak")
+def _streak_master(ctx):
+    return ctx.stats.current_streak >= 3
+
+
+@badge("perfect_score", "🥇", "Perfect Score", "Achieved 100% on a quiz")
+def _perfect_score(ctx):
+    return ctx.stats.best_score == 100
+
+
+@badge("explorer", "🧭", "Quiz Explorer", "Attempted quizzes in 3 categories")
+def _explorer(ctx):
+    return ctx.categories_attempted >= 3
+
+
+@badge("challenger", "🏔️", "Challenger", "Completed a hard quiz")
+def _challenger(ctx):
+    return ctx.completed_hard
+
+
+def earned_codes(ctx):
+    return [code for code, b in BADGES.items() if b.rule(ctx)]
+
+
+def award(user_id, codes):
+    """Store awards for ``codes``; ones the user already has are left alone."""
+    UserBadge.objects.bulk_create(
+        [UserBadge(user_id=user_id, code=code) for code in codes],
+        ignore_conflicts=True,
+    )
+
+
+def get_user_badges(user):
+    """Awarded badges as template dicts, oldest first."""
+    return [
+        {"icon": b.icon, "name": b.name, "description": b.description}
+        for b in (BADGES.get(code) for code in user.badges.values_list("code", flat=True))
+        if b is not None
+    ]
+
+
+def backfill_badges(batch_size=1000):
+    """Evaluate every rule for every user with stats. Returns (users, new awards)."""
+    users = awarded = 0
+    last_id = 0
+    while True:
+        batch = list(UserStats.objects.filter(user_id__gt=last_id).order_by("user_id")[:batch_size])
+        if not batch:
+            return users, awarded
+        last_id = batch[-1].user_id
+        user_ids = [s.user_id for s in batch]
+
+        categories = dict(
+            UserCategoryStats.objects.filter(user_id__in=user_ids)
+            .values("user_id").annotate(n=Count("id")).values_list("user_id", "n")
+        )
+        hard = set(
+            QuizHistory.objects
+            .filter(user_id__in=user_ids, completed_at__isnull=False, quiz__difficulty="hard")
+            .values_list("user_id", flat=True).distinct()
+        )
+        before = UserBadge.objects.filter(user_id__in=user_ids).count()
+        UserBadge.objects.bulk_create(
+            [
+                UserBadge(user_id=s.user_id, code=code)
+                for s in batch
+                for code in earned_codes(BadgeContext(s, categories.get(s.user_id, 0), s.user_id in hard))
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        awarded += UserBadge.objects.filter(user_id__in=user_ids).count() - before
+        users += len(batch)
+
+
+@receiver(quiz_completed, dispatch_uid="award_badges")
+def award_badges(sender, history, stats, **kwargs):
+    ctx = BadgeContext(
+        stats=stats,
+        categories_attempted=UserCategoryStats.objects.filter(user_id=history.user_id).count(),
+        # A hard quiz completed earlier already earned the badge back then.
+        completed_hard=history.quiz.difficulty == "hard",
+    )
+    award(history.user_id, earned_codes(ctx))
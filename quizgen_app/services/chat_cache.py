@@ -0,0 +1,128 @@
+"""
+Answer cache in front of the chatbot.
+
+Most chat traffic is the same few dozen app questions, so answers are kept
+in a per-process LRU keyed on a normalized form of the message (case,
+whitespace, punctuation, simple suffix stemming) and the system-prompt
+version, with a TTL and a maximum size (``settings.QUIZ_CHAT_CACHE``).
+PinnedAnswer rows, edited in the admin, are canonical FAQ answers that are
+served before the cache and the LLM.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from ..models import PinnedAnswer
+from .dedup import normalize
+from .metrics import register_collector
+
+DEFAULTS = {"MAX_SIZE": 500, "TTL": 3600}
+
+SUFFIXES = ("ing", "ed", "es", "s")
+
+
+def _stem(word):
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_message(message):
+    return " ".join(_stem(word) for word in normalize(message).split())
+
+
+def message_key(message):
+    return hashlib.sha1(normalize_message(message).encode()).hexdigest()
+
+
+class AnswerCache:
+    """Thread-safe LRU of answers with a TTL. Also counts hits and the LLM time they saved."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (answer, stored at, seconds the LLM took)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "pinned_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self.saved_seconds = 0.0
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                self.counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            self.saved_seconds += entry[2]
+            return entry[0]
+
+    def set(self, key, answer, elapsed):
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic(), elapsed)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            counters = dict(self.counters)
+            size = len(self._entries)
+            saved = self.saved_seconds
+        lookups = counters["hits"] + counters["pinned_hits"] + counters["misses"]
+        return {
+            **counters,
+            "size": size,
+            "hit_rate": round((counters["hits"] + counters["pinned_hits"]) / lookups, 4) if lookups else 0.0,
+            "latency_saved_seconds": round(saved, 3),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = {**DEFAULTS, **getattr(settings, "QUIZ_CHAT_CACHE", {})}
+            _cache = AnswerCache(config["MAX_SIZE"], config["TTL"])
+            register_collector("chat_cache", _cache.metrics)
+        return _cache
+
+
+def cache_key(message, prompt_version):
+    return f"{prompt_version}:{message_key(message)}"
+
+
+async def lookup(message, prompt_version):
+    """A pinned or cached answer for ``message``, or None."""
+    cache = get_answer_cache()
+    pinned = await PinnedAnswer.objects.filter(key=message_key(message), is_active=True).values_list("answer", flat=True).afirst()
+    if pinned is not None:
+        cache._count("pinned_hits")
+        return pinned
+    return cache.get(cache_key(message, prompt_version))
+
+
+def store(message, prompt_version, answer, elapsed):
+    if answer:
+        get_answer_cache().set(cache_key(message, prompt_version), answer, elapsed)
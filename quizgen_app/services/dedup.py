@@ -0,0 +1,142 @@
+"""
+Near-duplicate detection for bank questions.
+
+Every Question gets a QuestionFingerprint: a hash of its normalized text
+(catches case/punctuation/whitespace variants) and a MinHash signature over
+word shingles, split into LSH bands stored as QuestionLSHBucket rows
+(catches rewordings). Both hashes are salted with the bank quiz id, so a
+lookup is one or two indexed equality queries no matter how big the table
+gets, and only questions in the same pool are compared.
+"""
+import hashlib
+import random
+import re
+import struct
+from collections import namedtuple
+
+from ..models import QuestionFingerprint, QuestionLSHBucket
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity above which two questions count as the same.
+THRESHOLD = 0.7
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)
+]
+_SIGNATURE = struct.Struct(f"<{NUM_PERM}I")
+
+Fingerprint = namedtuple("Fingerprint", ["text_hash", "signature", "buckets"])
+
+
+def normalize(text):
+    text = re.sub(r"[^\w\s]", " ", str(text).lower())
+    return " ".join(text.split())
+
+
+def _shingles(normalized):
+    words = normalized.split()
+    if len(words) < 2:
+        return set(words) or {""}
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def fingerprint(quiz_id, text):
+    normalized = normalize(text)
+    text_hash = hashlib.sha1(f"{quiz_id}:{normalized}".encode()).hexdigest()
+
+    hashed = [_hash64(s) for s in _shingles(normalized)]
+    signature = tuple(
+        min(((a * h + b) % _MERSENNE) & 0xFFFFFFFF for h in hashed)
+        for a, b in _PERMUTATIONS
+    )
+
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        key = f"{quiz_id}:{band}:" + ",".join(map(str, rows))
+        buckets.append(_hash64(key) >> 1)   # fits a signed BigIntegerField
+    return Fingerprint(text_hash, signature, buckets)
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def find_duplicate(fp):
+    """Return the id of an indexed question that ``fp`` duplicates, or None."""
+    exact = (
+        QuestionFingerprint.objects
+        .filter(text_hash=fp.text_hash)
+        .values_list("question_id", flat=True)
+        .first()
+    )
+    if exact:
+        return exact
+
+    candidates = (
+        QuestionLSHBucket.objects
+        .filter(bucket__in=fp.buckets)
+        .values_list("fingerprint_id", "fingerprint__minhash")
+        .distinct()
+    )
+    for question_id, minhash in candidates:
+        if similarity(fp.signature, _SIGNATURE.unpack(bytes(minhash))) >= THRESHOLD:
+            return question_id
+    return None
+
+
+def index_questions(questions, fingerprints=None):
+    """Add index rows for saved ``questions`` (bulk, two bulk_creates per call)."""
+    if fingerprints is None:
+        fingerprints = [fingerprint(q.quiz_id, q.text) for q in questions]
+    rows = QuestionFingerprint.objects.bulk_create([
+        QuestionFingerprint(question=q, text_hash=fp.text_hash, minhash=_SIGNATURE.pack(*fp.signature))
+        for q, fp in zip(questions, fingerprints)
+    ])
+    # fingerprint_id rather than fingerprint=row skips the related-object
+    # descriptor, which is most of the cost of BANDS rows per question.
+    QuestionLSHBucket.objects.bulk_create(
+        [
+            QuestionLSHBucket(fingerprint_id=row.pk, bucket=bucket)
+            for row, fp in zip(rows, fingerprints)
+            for bucket in fp.buckets
+        ],
+        batch_size=2000,
+    )
+
+
+class DuplicateFilter:
+    """
+    Checks candidate questions for one pool against the index and against
+    the candidates already accepted in this batch (which are not indexed yet).
+    """
+
+    def __init__(self, quiz):
+        self.quiz_id = quiz.id
+        self._hashes = set()
+        self._buckets = {}
+
+    def check(self, text):
+        """Return the question's Fingerprint if it is new, None if it is a duplicate."""
+        fp = fingerprint(self.quiz_id, text)
+        if fp.text_hash in self._hashes:
+            return None
+        for bucket in fp.buckets:
+            for other in self._buckets.get(bucket, ()):
+                if similarity(fp.signature, other) >= THRESHOLD:
+                    return None
+        if find_duplicate(fp) is not None:
+            return None
+
+        self._hashes.add(fp.text_hash)
+        for bucket in fp.buckets:
+            self._buckets.setdefault(bucket, []).append(fp.signature)
+        return fp
@@ -0,0 +1,89 @@
+"""
+Keyset pagination for a user's quiz history.
+
+Pages are ordered by (-completed_at, -id) and addressed by a cursor that
+encodes the boundary row, so every page is one indexed range scan of
+``per_page + 1`` rows: no COUNT(*) and no OFFSET, and page 500 costs the
+same as page 1.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import QuizHistory
+
+PER_PAGE = 10
+
+HistoryPage = namedtuple("HistoryPage", ["rows", "newer", "older"])
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(history):
+    micros = (history.completed_at - _EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{history.id}"
+
+
+def decode_cursor(cursor):
+    """(completed_at, id) from a cursor string, or None if it is malformed."""
+    try:
+        micros, pk = (int(part) for part in str(cursor).split("-"))
+    except ValueError:
+        return None
+    return _EPOCH + timedelta(microseconds=micros), pk
+
+
+def filtered_history(user, category=None, subcategory=None, difficulty=None, date_from=None, date_to=None):
+    qs = (
+        QuizHistory.objects
+        .filter(user=user, completed_at__isnull=False)
+        .select_related("quiz__category", "quiz__subcategory")
+    )
+    if category:
+        qs = qs.filter(quiz__category=category)
+    if subcategory:
+        qs = qs.filter(quiz__subcategory=subcategory)
+    if difficulty:
+        qs = qs.filter(quiz__difficulty=difficulty)
+    # Whole local days, as plain ranges on completed_at so the index is used.
+    if date_from:
+        qs = qs.filter(completed_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+    if date_to:
+        qs = qs.filter(completed_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)))
+    return qs
+
+
+def history_page(qs, after=None, before=None, per_page=PER_PAGE):
+    """
+    One page of ``qs``: the rows older than cursor ``after``, newer than
+    cursor ``before``, or the newest rows. ``newer``/``older`` are the
+    cursors for the neighbouring pages (None at either end).
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if before:
+        completed_at, pk = before
+        rows = list(
+            qs.filter(Q(completed_at__gt=completed_at) | Q(completed_at=completed_at, id__gt=pk))
+            .order_by("completed_at", "id")[:per_page + 1]
+        )
+        has_newer = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_older = True
+    else:
+        if after:
+            completed_at, pk = after
+            qs = qs.filter(Q(completed_at__lt=completed_at) | Q(completed_at=completed_at, id__lt=pk))
+        rows = list(qs.order_by("-completed_at", "-id")[:per_page + 1])
+        has_older = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = bool(after)
+
+    return HistoryPage(
+        rows=rows,
+        newer=encode_cursor(rows[0]) if rows and has_newer else None,
+        older=encode_cursor(rows[-1]) if rows and has_older else None,
+    )
@@ -0,0 +1,98 @@
+"""
+Request, SQL and LLM timings.
+
+``MetricsMiddleware`` (quizgen_app/middleware.py) times every request by
+view name. A DB execute wrapper, installed on each connection as it is
+opened, times every query and adds it to the current request's totals; the
+request is found through a context variable, which follows async views into
+``sync_to_async`` threads. The LLM client reports each call through
+``observe_llm_call``. Everything is exported by ``metrics.render_prometheus``
+at /metrics/.
+"""
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import counter, histogram
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+REQUEST_DURATION = histogram(
+    "quizgen_http_request_duration_seconds", "Time to the response, by view.", ["view", "method"],
+)
+REQUESTS = counter(
+    "quizgen_http_requests_total", "Requests by view and status class.", ["view", "method", "status"],
+)
+REQUEST_QUERIES = histogram(
+    "quizgen_http_request_sql_queries", "SQL queries per request.", ["view"], QUERY_COUNT_BUCKETS,
+)
+REQUEST_SQL_DURATION = histogram(
+    "quizgen_http_request_sql_duration_seconds", "SQL time per request.", ["view"],
+)
+QUERY_DURATION = histogram(
+    "quizgen_sql_query_duration_seconds", "Time per SQL query, requests and background jobs.", ["alias"],
+)
+LLM_DURATION = histogram(
+    "quizgen_llm_request_duration_seconds",
+    "LLM call time including retries and queueing (to the end of the stream for streams).",
+    ["operation", "outcome"], LLM_BUCKETS,
+)
+LLM_TOKENS = counter(
+    "quizgen_llm_tokens_total", "Tokens reported by the provider.", ["operation", "kind"],
+)
+
+# [queries, seconds] of the request being served, if any
+_request_sql = ContextVar("request_sql", default=None)
+
+
+def enabled():
+    return getattr(settings, "QUIZ_METRICS_ENABLED", True)
+
+
+def start_request():
+    return _request_sql.set([0, 0.0])
+
+
+def finish_request(token, request, response, started):
+    totals = _request_sql.get()
+    _request_sql.reset(token)
+    match = getattr(request, "resolver_match", None)
+    # URL names only: raw paths would make one series per user / quiz id.
+    view = (match.view_name if match else None) or "<unmatched>"
+    REQUEST_DURATION.observe(time.perf_counter() - started, view, request.method)
+    REQUESTS.inc(view, request.method, f"{response.status_code // 100}xx")
+    REQUEST_QUERIES.observe(totals[0], view)
+    REQUEST_SQL_DURATION.observe(totals[1], view)
+
+
+def sql_timer(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        QUERY_DURATION.observe(elapsed, context["connection"].alias)
+        totals = _request_sql.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+@receiver(connection_created, dispatch_uid="instrumentation_sql_timer")
+def install_sql_timer(sender, connection, **kwargs):
+    # connection_created fires again on every reconnect of the same wrapper.
+    if enabled() and sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+def observe_llm_call(operation, outcome, seconds, usage=None):
+    LLM_DURATION.observe(seconds, operation, outcome)
+    if usage is not None:
+        for kind in ("prompt_tokens", "completion_tokens"):
+            tokens = getattr(usage, kind, None)
+            if tokens:
+                LLM_TOKENS.inc(operation, kind.replace("_tokens", ""), amount=tokens)
@@ -0,0 +1,122 @@
+"""
+Background quiz generation jobs.
+
+``generate_quiz_view`` only creates a GenerationJob row and hands its id to
+``enqueue_generation``; the questions are drawn from the bank (and streamed
+from the LLM, on a pool miss) off the request path and written as
+AttemptQuestion rows as they arrive. Where the job runs is decided by
+``settings.QUIZ_JOB_RUNNER``:
+
+* ``"thread"``   - a process-wide thread pool (default)
+* ``"external"`` - left queued for ``manage.py run_generation_worker``
+* ``"eager"``    - inline in the request, for tests and debugging
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from ..models import AttemptQuestion, GenerationJob
+from .question_bank import iter_question_batches, new_seed
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "QUIZ_JOB_WORKERS", 4),
+                thread_name_prefix="quizgen-job",
+            )
+        return _executor
+
+
+def enqueue_generation(job_id):
+    runner = getattr(settings, "QUIZ_JOB_RUNNER", "thread")
+    if runner == "eager":
+        run_generation_job(job_id)
+    elif runner == "thread":
+        # The worker thread has its own DB connection, so only hand the job
+        # over once the row is visible to it.
+        transaction.on_commit(lambda: get_executor().submit(_run_in_thread, job_id))
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_generation_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_generation_job(job_id):
+    """Claim a queued job and fill in its questions. Safe to call twice."""
+    claimed = (
+        GenerationJob.objects
+        .filter(id=job_id, status=GenerationJob.QUEUED)
+        .update(status=GenerationJob.RUNNING, updated_at=timezone.now())
+    )
+    if not claimed:
+        return
+
+    job = GenerationJob.objects.select_related(
+        "user", "history__quiz__category", "history__quiz__subcategory"
+    ).get(id=job_id)
+    history = job.history
+
+    try:
+        # Questions are appended as they arrive, so the player can start on
+        # question 0 while the rest is still being generated.
+        for batch in iter_question_batches(job.user, history.quiz, job.count):
+            if not batch or job.status == GenerationJob.DONE:
+                continue
+            with transaction.atomic():
+                AttemptQuestion.objects.bulk_create([
+                    AttemptQuestion(history=history, position=job.ready + i, question=q, seed=new_seed())
+                    for i, q in enumerate(batch)
+                ])
+                job.ready += len(batch)
+                if job.ready >= job.count:
+                    job.status = GenerationJob.DONE
+                job.save(update_fields=["ready", "status", "updated_at"])
+        if not job.ready:
+            raise RuntimeError("No questions could be generated")
+        job.status = GenerationJob.DONE
+    except Exception as e:
+        logger.exception("Generation job %s failed", job_id)
+        if job.ready:
+            # Like a short pool: the questions already written make the quiz.
+            job.status = GenerationJob.DONE
+        else:
+            job.status = GenerationJob.FAILED
+            job.error = str(e)
+
+    with transaction.atomic():
+        job.save(update_fields=["status", "error", "updated_at"])
+        if job.status == GenerationJob.DONE:
+            history.total_questions = job.ready
+            history.save(update_fields=["total_questions", "updated_at"])
+
+
+def run_queued_jobs(limit=None):
+    """Run queued jobs in the current process. Returns how many were picked up."""
+    job_ids = (
+        GenerationJob.objects
+        .filter(status=GenerationJob.QUEUED)
+        .order_by("created_at")
+        .values_list("id", flat=True)
+    )
+    if limit:
+        job_ids = job_ids[:limit]
+    job_ids = list(job_ids)
+    for job_id in job_ids:
+        run_generation_job(job_id)
+    return len(job_ids)
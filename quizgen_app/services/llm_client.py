@@ -0,0 +1,331 @@
+"""
+Shared LLM client.
+
+One AsyncOpenAI-compatible client per process on top of a keep-alive httpx pool,
+with explicit connect/read deadlines, jittered exponential retries on 429/5xx
+and a circuit breaker that fails fast for a cool-down window after repeated
+failures. Configured by ``settings.QUIZ_LLM_CLIENT``; the underlying client
+and the default model come from the provider (``providers.get_provider()``).
+
+Calls are coroutines, so one event loop can keep hundreds in flight without
+a thread each; sync code (generation jobs) runs them on a process-wide loop
+thread through ``run_coroutine``. The breaker (``get_breaker()``) is one per
+process, whatever the loop. Every call first takes a slot from the admission
+limiter (``admission.get_limiter()``), so a burst queues briefly or is shed
+instead of piling onto the provider.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+from .admission import AdmissionRejected, get_limiter
+from .instrumentation import observe_llm_call
+from .metrics import register_collector
+from .providers import get_provider, reset_provider
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BASE_URL": "https://openrouter.ai/api/v1",
+    "API_KEY": None,
+    "ASYNC_POOL_SIZE": 200,
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 60.0,
+    "MAX_RETRIES": 2,
+    "BACKOFF_BASE": 0.5,
+    "BACKOFF_MAX": 8.0,
+    "BREAKER_THRESHOLD": 5,
+    "BREAKER_COOLDOWN": 30.0,
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the API while the breaker is open."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now. After the cool-down one trial call is let through."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("LLM circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning("LLM circuit breaker opened after %d failures", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+            }
+
+
+def _is_retryable(exc):
+    return isinstance(exc, APIStatusError) and (exc.status_code == 429 or exc.status_code >= 500)
+
+
+def _counts_as_failure(exc):
+    """Upstream trouble opens the breaker; our own bad requests (4xx) do not."""
+    return _is_retryable(exc) or isinstance(exc, (APIConnectionError, APITimeoutError))
+
+
+def _outcome(exc):
+    """Metrics label for a call that raised ``exc``."""
+    if isinstance(exc, AdmissionRejected):
+        return "rejected"
+    if isinstance(exc, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(exc, APITimeoutError):
+        return "timeout"
+    if isinstance(exc, asyncio.CancelledError):
+        return "cancelled"
+    return "error"
+
+
+class _HeldStream:
+    """
+    A streaming completion that gives its limiter slot back, and records the
+    call, once it is exhausted or closed.
+    """
+
+    def __init__(self, stream, finish):
+        self._stream = stream
+        self._finish = finish
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        outcome, usage = "cancelled", None
+        try:
+            async for chunk in self._stream:
+                # Providers that report usage put it on the last chunk
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+            outcome = "ok"
+        except Exception as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            self._finish(outcome, usage)
+
+    async def close(self):
+        try:
+            await self._stream.close()
+        finally:
+            self._finish("cancelled")
+
+
+class AsyncLLMClient:
+    """The provider's AsyncOpenAI client behind the retry / breaker / admission policy."""
+
+    def __init__(self, provider, breaker, limiter=None, **config):
+        self.provider = provider
+        self.config = {**DEFAULTS, **config}
+        self.breaker = breaker
+        self.limiter = limiter
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+        self._counter_lock = threading.Lock()
+        self._clients = weakref.WeakKeyDictionary()
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # An httpx.AsyncClient's connections belong to the event loop that
+        # opened them, so keep one client per loop (one per process under ASGI).
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self.provider.make_async_client(self.config)
+                self._clients[loop] = client
+            return client
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def _backoff(self, attempt):
+        ceiling = min(self.config["BACKOFF_MAX"], self.config["BACKOFF_BASE"] * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("LLM circuit breaker is open")
+        self._count("calls")
+
+    def _should_retry(self, exc, attempt):
+        """Record a failed call; True if it should be tried again."""
+        if _counts_as_failure(exc):
+            self.breaker.record_failure()
+            self._count("failures")
+        else:
+            # The API answered (e.g. a 400), so it is reachable.
+            self.breaker.record_success()
+        if _is_retryable(exc) and attempt < self.config["MAX_RETRIES"]:
+            self._count("retries")
+            return True
+        return False
+
+    async def chat_completion(self, operation="chat", **kwargs):
+        """
+        ``chat.completions.create(**kwargs)`` with deadlines, retries and the
+        breaker, inside a limiter slot. Raises AdmissionRejected if no slot
+        frees up in time. With ``stream=True`` the slot is held, and the call
+        timed, until the returned stream is exhausted or closed. ``operation``
+        labels the call in the LLM metrics.
+        """
+        started = time.monotonic()
+        if self.limiter is not None:
+            try:
+                await self.limiter.acquire()
+            except AdmissionRejected:
+                observe_llm_call(operation, "rejected", time.monotonic() - started)
+                raise
+        acquired = time.monotonic()
+        finished = False
+
+        def finish(outcome, usage=None):
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            now = time.monotonic()
+            if self.limiter is not None:
+                self.limiter.release(now - acquired)
+            observe_llm_call(operation, outcome, now - started, usage)
+
+        try:
+            result = await self._chat_completion(**kwargs)
+        except BaseException as e:
+            finish(_outcome(e))
+            raise
+        if kwargs.get("stream"):
+            return _HeldStream(result, finish)
+        finish("ok", getattr(result, "usage", None))
+        return result
+
+    async def _chat_completion(self, **kwargs):
+        kwargs.setdefault("model", self.provider.model)
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                result = await self.client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self.breaker.record_success()
+            return result
+
+    def metrics(self):
+        with self._counter_lock:
+            counters = dict(self.counters)
+        return {**counters, "breaker": self.breaker.snapshot()}
+
+
+_breaker = None
+_async_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "QUIZ_LLM_CLIENT", {})}
+
+
+def get_breaker():
+    """The process-wide breaker: one upstream, one breaker."""
+    global _breaker
+    with _llm_client_lock:
+        if _breaker is None:
+            config = _config()
+            _breaker = CircuitBreaker(config["BREAKER_THRESHOLD"], config["BREAKER_COOLDOWN"])
+        return _breaker
+
+
+def get_async_llm_client():
+    global _async_llm_client
+    breaker = get_breaker()
+    with _llm_client_lock:
+        if _async_llm_client is None:
+            _async_llm_client = AsyncLLMClient(get_provider(), breaker, limiter=get_limiter(), **_config())
+            register_collector("llm_client_async", _async_llm_client.metrics)
+        return _async_llm_client
+
+
+@receiver(setting_changed, dispatch_uid="llm_client_settings_changed")
+def reset_clients(setting, **kwargs):
+    """Rebuild the provider, breaker and client after override_settings touches their config."""
+    global _breaker, _async_llm_client
+    if setting in ("QUIZ_LLM_PROVIDER", "QUIZ_LLM_CLIENT"):
+        reset_provider()
+        with _llm_client_lock:
+            _breaker = _async_llm_client = None
+    elif setting == "QUIZ_ADMISSION":
+        # The client holds on to the limiter it was built with.
+        with _llm_client_lock:
+            _async_llm_client = None
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def run_coroutine(coro):
+    """Run ``coro`` on the process-wide LLM event loop; returns a concurrent.futures.Future."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="quizgen-llm-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop)
@@ -0,0 +1,180 @@
+"""
+Process-wide metrics hooks.
+
+Components that keep their own counters (LLM client, caches, ...) register a
+collector here; ``collect()`` returns a snapshot of all of them.
+
+``histogram()`` and ``counter()`` define labelled Prometheus-style metrics
+(request, SQL and LLM latency, see ``instrumentation``). ``render_prometheus()``
+writes those plus every collector snapshot, as gauges, in the Prometheus text
+exposition format. Observing is a bisect and a short lock, cheap enough to
+leave on in production.
+"""
+import logging
+import re
+import threading
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+_collectors = {}
+_lock = threading.Lock()
+
+# Seconds; from a cache hit to a slow LLM call.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def register_collector(name, fn):
+    """Register ``fn() -> dict`` under ``name``. Re-registering replaces it."""
+    with _lock:
+        _collectors[name] = fn
+
+
+def collect():
+    with _lock:
+        collectors = dict(_collectors)
+    snapshot = {}
+    for name, fn in collectors.items():
+        try:
+            snapshot[name] = fn()
+        except Exception:
+            logger.exception("Metrics collector %s failed", name)
+    return snapshot
+
+
+def percentile_ms(samples, pct):
+    """The ``pct``-th percentile of latency ``samples`` (seconds), in ms; None if there are none."""
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * pct / 100))] * 1000, 2)
+
+
+# ---------------- Prometheus metrics ----------------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        with self._lock:
+            series = {key: self._copy(value) for key, value in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key in sorted(series):
+            lines.extend(self._lines(key, series[key]))
+        return lines
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def _lines(self, key, value):
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)   # first bucket with le >= value
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _copy(self, value):
+        return [list(value[0]), value[1]]
+
+    def _lines(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="' + _number(bound) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+        labels = _labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_number(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+_metrics = {}
+
+
+def _register(cls, name, *args, **kwargs):
+    with _lock:
+        if name not in _metrics:
+            _metrics[name] = cls(name, *args, **kwargs)
+        return _metrics[name]
+
+
+def counter(name, help, labels=()):
+    return _register(Counter, name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, labels, buckets)
+
+
+def _gauges(name, value):
+    """Flatten one collector snapshot into gauge lines; strings become a ``value`` label."""
+    name = re.sub(r"[^a-zA-Z0-9_]", "_", name)
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            lines.extend(_gauges(f"{name}_{key}", item))
+        return lines
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+    if isinstance(value, str):
+        return [f"# TYPE {name} gauge", f'{name}{{value="{_escape(value)}"}} 1']
+    return []
+
+
+def render_prometheus(prefix="quizgen"):
+    with _lock:
+        metrics = list(_metrics.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    for name, snapshot in sorted(collect().items()):
+        lines.extend(_gauges(f"{prefix}_{name}", snapshot))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,110 @@
+"""
+Per-user versioned cache for the dashboard, profile and history pages.
+
+A user's numbers only change when they submit a quiz or edit their profile,
+so page contexts and rendered fragments are cached under a key that
+includes a per-user version number. Submitting or saving the profile bumps
+the version; stale entries are never read again and simply expire.
+
+Uses the Django cache named by ``settings.QUIZ_PAGE_CACHE`` (see CACHES):
+local-memory or file based on a single node, any shared backend when
+several nodes serve the same users.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from ..models import Profile
+from ..signals import quiz_completed
+from .metrics import register_collector
+
+KEY_PREFIX = "quizgen:page"
+
+_counters = {}
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, "QUIZ_PAGE_CACHE", "default")]
+
+
+def _count(name, outcome):
+    with _lock:
+        page = _counters.setdefault(name, {"hits": 0, "misses": 0})
+        page[outcome] += 1
+
+
+def metrics():
+    with _lock:
+        pages = {name: dict(c) for name, c in _counters.items()}
+    return {
+        "hits": sum(c["hits"] for c in pages.values()),
+        "misses": sum(c["misses"] for c in pages.values()),
+        "pages": pages,
+    }
+
+
+register_collector("page_cache", metrics)
+
+
+def _version_key(user_id):
+    return f"{KEY_PREFIX}:v:{user_id}"
+
+
+def _fresh_version():
+    # Clock based, so a counter that was evicted never restarts at a
+    # version that still has entries cached under it.
+    return time.time_ns() // 1000
+
+
+def get_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)   # another worker may have won the add
+    return version
+
+
+def bump_version(user_id):
+    cache = _cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _fresh_version(), timeout=None)
+
+
+def cached_for_user(user_id, name, build, *vary):
+    """Return ``build()`` for this user's current version, from the cache if possible."""
+    key = f"{KEY_PREFIX}:{name}:{user_id}:{get_version(user_id)}"
+    if vary:
+        key += ":" + hashlib.md5(repr(vary).encode()).hexdigest()
+
+    cache = _cache()
+    value = cache.get(key)
+    if value is not None:
+        _count(name, "hits")
+        return value
+    _count(name, "misses")
+    value = build()
+    cache.set(key, value, getattr(settings, "QUIZ_PAGE_CACHE_TIMEOUT", 600))
+    return value
+
+
+# Bump after commit, so a request racing the submit can't cache the old
+# numbers under the new version.
+@receiver(quiz_completed, dispatch_uid="page_cache_quiz_completed")
+def _quiz_completed(sender, history, **kwargs):
+    transaction.on_commit(lambda: bump_version(history.user_id))
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="page_cache_profile_saved")
+def _profile_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_version(instance.user_id))
@@ -0,0 +1,227 @@
+"""
+LLM providers.
+
+A provider builds the AsyncOpenAI-compatible client the LLM client calls
+(``client.chat.completions.create(...)``) and names the default model, so
+timeouts, retries, the breaker, admission control and output parsing work
+the same whatever answers. Selected by ``settings.QUIZ_LLM_PROVIDER``:
+
+* ``"openrouter"`` - the HTTP API at ``QUIZ_LLM_CLIENT["BASE_URL"]``
+* ``"fake"``       - offline and deterministic: seeded, schema-valid quiz
+  questions and canned chat answers, with configurable latency, failure
+  rate (503s, retried like real ones) and malformed-item rate. For load
+  tests, benchmarks and CI.
+
+BACKEND may also be the dotted path of a provider class.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+from types import SimpleNamespace
+
+import httpx
+from django.conf import settings
+from django.utils.module_loading import import_string
+from openai import APIStatusError, AsyncOpenAI
+
+DEFAULTS = {
+    "BACKEND": "openrouter",
+    "MODEL": "google/gemini-flash-1.5",
+    "SEED": 0,
+    "LATENCY": 0.5,
+    "FAILURE_RATE": 0.0,
+    "MALFORMED_RATE": 0.0,
+}
+
+
+class OpenRouterProvider:
+    """OpenAI-compatible HTTP API on a keep-alive httpx pool."""
+
+    def __init__(self, model, **options):
+        self.model = model
+
+    def _timeout(self, config):
+        return httpx.Timeout(config["READ_TIMEOUT"], connect=config["CONNECT_TIMEOUT"])
+
+    def make_async_client(self, config):
+        pool_size = config["ASYNC_POOL_SIZE"]
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=self._timeout(config),
+        )
+        return AsyncOpenAI(
+            base_url=config["BASE_URL"],
+            api_key=config["API_KEY"],
+            http_client=http_client,
+            timeout=self._timeout(config),
+            max_retries=0,   # retries are handled by the LLM client
+        )
+
+
+# ---------------- Fake provider ----------------
+
+_QUIZ_PROMPT = re.compile(
+    r"Generate (\d+) multiple-choice questions\s+for category '(.*?)' and subcategory '(.*?)'"
+    r".*?difficulty (\w+)",
+    re.S,
+)
+
+# Random word runs keep fake questions apart under the near-duplicate check.
+_WORDS = (
+    "amber basin cobalt delta ember fjord garnet harbor iris juniper kelp lagoon "
+    "meadow nectar onyx prairie quartz ridge summit tundra umber valley willow "
+    "xenon yarrow zephyr atlas beacon canyon dune estuary falcon glacier heron "
+    "island jasper kestrel lantern marble nebula orchid pebble quiver raven "
+    "sierra thistle upland vortex walnut yonder zenith acorn bramble cedar"
+).split()
+
+
+def _usage(messages, text):
+    # Rough 4-characters-per-token count, so token metrics move offline too
+    prompt = sum(len(m["content"]) for m in messages)
+    return SimpleNamespace(prompt_tokens=prompt // 4 + 1, completion_tokens=len(text) // 4 + 1)
+
+
+def _message(content, usage=None):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage,
+    )
+
+
+def _delta(content, usage=None):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=usage,
+    )
+
+
+class _FakeStream:
+    """Text in parts; like OpenRouter, usage comes with the last chunk."""
+
+    def __init__(self, parts, pause, usage=None):
+        self._parts = parts
+        self._pause = pause
+        self._usage = usage
+
+    def _chunk(self, i):
+        return _delta(self._parts[i], self._usage if i == len(self._parts) - 1 else None)
+
+    async def _iterate(self):
+        for i in range(len(self._parts)):
+            await asyncio.sleep(self._pause)
+            yield self._chunk(i)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def close(self):
+        pass
+
+
+class FakeProvider:
+    """
+    Local stand-in for the API. Output depends only on SEED, the prompt and
+    how many calls came before, so a run can be replayed exactly.
+    """
+
+    STREAM_PARTS = 20
+
+    def __init__(self, model, SEED=0, LATENCY=0.5, FAILURE_RATE=0.0, MALFORMED_RATE=0.0, **options):
+        self.model = model
+        self.seed = SEED
+        self.latency = LATENCY
+        self.failure_rate = FAILURE_RATE
+        self.malformed_rate = MALFORMED_RATE
+        self._calls = itertools.count()
+        self._lock = threading.Lock()
+
+    def _rng(self, messages):
+        with self._lock:
+            call = next(self._calls)
+        digest = hashlib.sha1(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+        return random.Random(f"{self.seed}:{call}:{digest}")
+
+    def _failure(self):
+        request = httpx.Request("POST", "http://fake-llm/chat/completions")
+        return APIStatusError(
+            "Injected failure", response=httpx.Response(503, request=request), body=None
+        )
+
+    def _question(self, rng, category, subcategory, difficulty):
+        topic = " ".join(rng.sample(_WORDS, 6))
+        options = {label: " ".join(rng.sample(_WORDS, 2)) for label in "ABCD"}
+        item = {
+            "question": f"In {subcategory} ({category}, {difficulty}), what links {topic}?",
+            "options": options,
+            "answer": rng.choice("ABCD"),
+        }
+        if rng.random() < self.malformed_rate:
+            del item[rng.choice(["options", "answer"])]
+        return item
+
+    def _respond(self, messages):
+        """(response text, seconds it takes) for one call; text is None for an injected failure."""
+        rng = self._rng(messages)
+        latency = self.latency * rng.uniform(0.5, 1.5)
+        if rng.random() < self.failure_rate:
+            return None, latency
+        prompt = messages[-1]["content"]
+        match = _QUIZ_PROMPT.search(prompt)
+        if match:
+            count, category, subcategory, difficulty = match.groups()
+            questions = [self._question(rng, category, subcategory, difficulty) for _ in range(int(count))]
+            return json.dumps({"questions": questions}), latency
+        return f"(offline answer) You asked: {prompt.strip()[:200]}", latency
+
+    def _parts(self, text):
+        size = max(1, -(-len(text) // self.STREAM_PARTS))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def make_async_client(self, config):
+        provider = self
+
+        async def create(messages, stream=False, **kwargs):
+            text, latency = provider._respond(messages)
+            if text is None:
+                await asyncio.sleep(latency)
+                raise provider._failure()
+            usage = _usage(messages, text)
+            if stream:
+                return _FakeStream(provider._parts(text), latency / provider.STREAM_PARTS, usage)
+            await asyncio.sleep(latency)
+            return _message(text, usage)
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+PROVIDERS = {
+    "openrouter": OpenRouterProvider,
+    "fake": FakeProvider,
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def build_provider(config):
+    config = {**DEFAULTS, **config}
+    backend = config.pop("BACKEND")
+    cls = PROVIDERS.get(backend) or import_string(backend)
+    return cls(config.pop("MODEL"), **config)
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = build_provider(getattr(settings, "QUIZ_LLM_PROVIDER", {}))
+        return _provider
+
+
+def reset_provider():
+    global _provider
+    with _provider_lock:
+        _provider = None
@@ -0,0 +1,204 @@
+"""
+Question bank.
+
+Generated questions are saved as ``Question`` rows under one bank ``Quiz`` per
+(subcategory, difficulty). Quiz starts are served from that pool and the LLM
+is only called when the pool does not hold enough questions the user has not
+seen yet.
+"""
+import random
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import Question, Quiz, UserAnswer
+from .dedup import DuplicateFilter, index_questions
+from .quiz_api import generate_quiz_questions, stream_quiz_questions
+from .quiz_parser import LABELS, validate_item
+
+
+def get_pool_limits():
+    """(min, max) number of questions kept per (subcategory, difficulty)."""
+    min_pool = getattr(settings, "QUIZ_BANK_MIN_POOL", 20)
+    max_pool = getattr(settings, "QUIZ_BANK_MAX_POOL", 200)
+    return min_pool, max(min_pool, max_pool)
+
+
+def get_bank_quiz(category, subcategory, difficulty):
+    """
+    Return the Quiz that owns the pool for (subcategory, difficulty). The
+    unique_bank_quiz constraint makes concurrent first requests agree on it:
+    the loser of the insert race fetches the winner's row.
+    """
+    quiz, _ = Quiz.objects.get_or_create(
+        subcategory=subcategory,
+        difficulty=difficulty,
+        defaults={
+            "title": f"AI Quiz - {subcategory.name} ({difficulty})",
+            "category": category,
+            "description": f"AI generated quiz in {subcategory.name}",
+        },
+    )
+    return quiz
+
+
+def question_to_dict(question):
+    """Question row -> the {"question", "options", "answer"} shape used by the views."""
+    return {
+        "id": question.id,
+        "question": question.text,
+        "options": {
+            "A": question.option_a,
+            "B": question.option_b,
+            "C": question.option_c,
+            "D": question.option_d,
+        },
+        "answer": question.correct_answer,
+    }
+
+
+def option_order(seed):
+    """Original option labels in the order they are shown for ``seed``."""
+    return random.Random(seed).sample(LABELS, len(LABELS))
+
+
+def new_seed():
+    return random.randrange(1 << 31)
+
+
+def present_question(question, seed):
+    """question_to_dict with the options shuffled by ``seed`` and the answer label fixed up."""
+    original = question_to_dict(question)
+    order = option_order(seed)
+    return {
+        "id": question.id,
+        "question": original["question"],
+        "options": {label: original["options"][src] for label, src in zip(LABELS, order)},
+        "answer": LABELS[order.index(question.correct_answer)],
+    }
+
+
+def original_label(seed, shown_label):
+    """Map a label the user picked back to the Question's own A-D label."""
+    if shown_label not in LABELS:
+        return ""
+    return option_order(seed)[LABELS.index(shown_label)]
+
+
+def _build_question(quiz, item, duplicates):
+    """
+    LLM item -> (unsaved Question, Fingerprint), or None if it is malformed
+    or a near-duplicate of a question already in the pool.
+    """
+    item = validate_item(item)
+    if item is None:
+        return None
+    fp = duplicates.check(item["question"])
+    if fp is None:
+        return None
+    options = item["options"]
+    question = Question(
+        quiz=quiz,
+        text=item["question"],
+        option_a=options["A"],
+        option_b=options["B"],
+        option_c=options["C"],
+        option_d=options["D"],
+        correct_answer=item["answer"],
+    )
+    return question, fp
+
+
+def save_generated(quiz, items):
+    """Persist LLM output for ``quiz``, skipping malformed items and near-duplicates."""
+    duplicates = DuplicateFilter(quiz)
+    built = [b for b in (_build_question(quiz, item, duplicates) for item in items) if b]
+    if not built:
+        return []
+    with transaction.atomic():
+        questions = Question.objects.bulk_create([question for question, _ in built])
+        index_questions(questions, [fp for _, fp in built])
+    return questions
+
+
+def top_up(quiz, wanted):
+    """Ask the LLM for ``wanted`` more questions and add them to the pool."""
+    if wanted <= 0:
+        return []
+    items = generate_quiz_questions(
+        quiz.category.name,
+        quiz.subcategory.name,
+        num_questions=wanted,
+        difficulty=quiz.difficulty,
+    )
+    return save_generated(quiz, items)
+
+
+def stream_top_up(quiz, wanted):
+    """Like top_up, but save and yield each question as soon as the LLM finishes it."""
+    if wanted <= 0:
+        return
+    duplicates = DuplicateFilter(quiz)
+    items = stream_quiz_questions(
+        quiz.category.name,
+        quiz.subcategory.name,
+        num_questions=wanted,
+        difficulty=quiz.difficulty,
+    )
+    for item in items:
+        built = _build_question(quiz, item, duplicates)
+        if built is None:
+            continue
+        question, fp = built
+        with transaction.atomic():
+            question.save()
+            index_questions([question], [fp])
+        yield question
+
+
+def seen_question_ids(user, quiz):
+    return set(
+        UserAnswer.objects
+        .filter(history__user=user, question__quiz=quiz)
+        .values_list("question_id", flat=True)
+    )
+
+
+def iter_question_batches(user, quiz, count):
+    """
+    Yield lists of questions for ``user`` from the pool of bank ``quiz``,
+    ``count`` in total at most.
+
+    Unseen pool questions come first, in one batch. If there are not enough
+    of them the pool is topped up from the LLM (never beyond
+    QUIZ_BANK_MAX_POOL) and each new question is yielded on its own as soon
+    as it is saved; questions generated beyond ``count`` only go to the pool.
+    If the pool is full the remainder is filled with questions the user has
+    already seen.
+    """
+    min_pool, max_pool = get_pool_limits()
+
+    pool_ids = list(quiz.questions.values_list("id", flat=True))
+    seen = seen_question_ids(user, quiz)
+    unseen = [qid for qid in pool_ids if qid not in seen]
+    picked = random.sample(unseen, min(count, len(unseen)))
+    if picked:
+        by_id = Question.objects.in_bulk(picked)
+        yield [by_id[qid] for qid in picked]
+
+    shortfall = count - len(picked)
+    if shortfall > 0 or len(pool_ids) < min_pool:
+        wanted = min(max(shortfall, min_pool - len(pool_ids)), max_pool - len(pool_ids))
+        for question in stream_top_up(quiz, wanted):
+            pool_ids.append(question.id)
+            if len(picked) < count:
+                picked.append(question.id)
+                yield [question]
+
+    shortfall = count - len(picked)
+    if shortfall > 0:
+        chosen = set(picked)
+        rest = [qid for qid in pool_ids if qid not in chosen]
+        extra = random.sample(rest, min(shortfall, len(rest)))
+        by_id = Question.objects.in_bulk(extra)
+        yield [by_id[qid] for qid in extra if qid in by_id]
@@ -0,0 +1,261 @@
+"""
+Question bank import / export (``manage.py export_questions`` / ``import_questions``).
+
+One record per question, as JSON lines::
+
+    {"category": "Science", "subcategory": "Physics", "difficulty": "easy",
+     "quiz": "AI Quiz - Physics (easy)", "question": "...",
+     "options": {"A": "...", "B": "...", "C": "...", "D": "..."}, "answer": "B"}
+
+or as CSV with the same columns and the options flattened to option_a ..
+option_d. Both directions stream: export reads with ``iterator()``, import
+works in chunks of ``batch_size`` records, so memory does not grow with the
+file.
+
+Imported questions go to the bank pool of their (subcategory, difficulty),
+the same Quiz ``get_bank_quiz`` serves from. A question is identified by its
+normalized text within that pool (the QuestionFingerprint text hash), so a
+re-import skips, or with ``upsert`` updates, what is already there.
+"""
+import csv
+import gzip
+import json
+import sys
+from collections import Counter
+
+from django.db import reset_queries, transaction
+from django.utils import timezone
+
+from ..models import Category, Question, QuestionFingerprint, Quiz, SubCategory
+from .dedup import fingerprint, index_questions
+from .question_bank import get_bank_quiz
+from .quiz_parser import LABELS, OPTION_MAX_LENGTH, validate_item
+
+FORMATS = ("jsonl", "csv")
+CSV_FIELDS = [
+    "category", "subcategory", "difficulty", "quiz", "question",
+    "option_a", "option_b", "option_c", "option_d", "answer",
+]
+DIFFICULTIES = {value for value, _ in Quiz.DIFFICULTY_CHOICES}
+NAME_MAX_LENGTH = Category._meta.get_field("name").max_length
+# What an upsert overwrites; updated_at last, it is not compared.
+UPDATE_FIELDS = ["text", "option_a", "option_b", "option_c", "option_d", "correct_answer", "updated_at"]
+
+# Question.objects.values_list() columns, in record order, for export.
+EXPORT_COLUMNS = [
+    "quiz__category__name", "quiz__subcategory__name", "quiz__difficulty", "quiz__title", "text",
+    "option_a", "option_b", "option_c", "option_d", "correct_answer",
+]
+
+
+class RecordError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+
+def open_text(path, mode):
+    """``path`` as a text file; "-" is stdin / stdout and a .gz suffix is gzipped."""
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+# ---------------- Export ----------------
+
+def export_rows(queryset, batch_size=2000):
+    """Yield one CSV-shaped dict per question of ``queryset``, in id order, in constant memory."""
+    rows = queryset.order_by("id").values_list(*EXPORT_COLUMNS).iterator(chunk_size=batch_size)
+    for row in rows:
+        row = dict(zip(CSV_FIELDS, row))
+        row["subcategory"] = row["subcategory"] or ""
+        yield row
+
+
+def write_records(rows, f, fmt):
+    """Write export_rows() output to ``f``; returns the number written."""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+    for row in rows:
+        record = {key: row[key] for key in CSV_FIELDS[:5]}
+        record["options"] = {label: row[f"option_{label.lower()}"] for label in LABELS}
+        record["answer"] = row["answer"]
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+# ---------------- Import ----------------
+
+def read_records(f, fmt):
+    """Yield (line number, record dict); the record is None for a line that does not parse."""
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            row["options"] = {label: row.pop(f"option_{label.lower()}", None) for label in LABELS}
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_no, record if isinstance(record, dict) else None
+
+
+def clean_record(record):
+    """Record -> (category, subcategory, difficulty, quiz title, bank item); raises RecordError."""
+    if record is None:
+        raise RecordError("not a JSON object")
+    category = str(record.get("category") or "").strip()
+    subcategory = str(record.get("subcategory") or "").strip()
+    difficulty = str(record.get("difficulty") or "easy").strip().lower()
+    if not category:
+        raise RecordError("no category")
+    if max(len(category), len(subcategory)) > NAME_MAX_LENGTH:
+        raise RecordError(f"category or subcategory name longer than {NAME_MAX_LENGTH} characters")
+    if difficulty not in DIFFICULTIES:
+        raise RecordError(f"unknown difficulty {difficulty!r}")
+    item = validate_item(record)
+    if item is None:
+        raise RecordError(f"needs a question, four options of at most {OPTION_MAX_LENGTH} characters and an answer")
+    return category, subcategory, difficulty, str(record.get("quiz") or "").strip(), item
+
+
+class Importer:
+    """
+    Buffers cleaned records and writes them ``batch_size`` at a time: one
+    lookup of the existing text hashes, one bulk_create of the new questions
+    and their index rows, and with ``upsert`` one bulk_update of the changed
+    ones, per batch. Categories, subcategories and pool quizzes come from
+    in-memory caches, so a row costs no queries of its own.
+    """
+
+    def __init__(self, upsert=False, batch_size=1000):
+        self.upsert = upsert
+        self.batch_size = batch_size
+        self.stats = Counter()
+        self._pending = []
+        self._categories = {c.name: c for c in Category.objects.all()}
+        self._subcategories = {}
+        for sub in SubCategory.objects.order_by("id"):
+            self._subcategories.setdefault((sub.category_id, sub.name), sub)
+        self._quizzes = {}
+
+    def _category(self, name):
+        category = self._categories.get(name)
+        if category is None:
+            category = self._categories[name] = Category.objects.create(name=name)
+            self.stats["categories_created"] += 1
+        return category
+
+    def _subcategory(self, category, name):
+        sub = self._subcategories.get((category.id, name))
+        if sub is None:
+            sub = self._subcategories[category.id, name] = SubCategory.objects.create(name=name, category=category)
+            self.stats["subcategories_created"] += 1
+        return sub
+
+    def _quiz(self, category_name, subcategory_name, difficulty, title):
+        # Without a subcategory there is no bank pool; those match on title.
+        key = (category_name, subcategory_name, difficulty, "" if subcategory_name else title)
+        quiz = self._quizzes.get(key)
+        if quiz is not None:
+            return quiz
+        category = self._category(category_name)
+        if subcategory_name:
+            quiz = get_bank_quiz(category, self._subcategory(category, subcategory_name), difficulty)
+        else:
+            fields = {
+                "category": category,
+                "subcategory": None,
+                "difficulty": difficulty,
+                "title": (title or f"Imported - {category_name} ({difficulty})")[:255],
+            }
+            quiz = Quiz.objects.filter(**fields).order_by("id").first() or Quiz.objects.create(**fields)
+        self._quizzes[key] = quiz
+        return quiz
+
+    def add(self, record):
+        category, subcategory, difficulty, title, item = clean_record(record)
+        self._pending.append((self._quiz(category, subcategory, difficulty, title), item))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        batch = {}
+        for quiz, item in pending:
+            fp = fingerprint(quiz.id, item["question"])
+            if fp.text_hash in batch:
+                self.stats["duplicates"] += 1
+            batch[fp.text_hash] = (quiz, item, fp)   # the last copy in the file wins
+
+        existing = dict(
+            QuestionFingerprint.objects
+            .filter(text_hash__in=list(batch))
+            .values_list("text_hash", "question_id")
+        )
+        new = [
+            (self._question(quiz, item), fp)
+            for text_hash, (quiz, item, fp) in batch.items()
+            if text_hash not in existing
+        ]
+        changed = self._changed(batch, existing) if self.upsert and existing else []
+
+        with transaction.atomic():
+            created = Question.objects.bulk_create([question for question, _ in new])
+            index_questions(created, [fp for _, fp in new])
+            if changed:
+                Question.objects.bulk_update(changed, UPDATE_FIELDS)
+
+        # Under DEBUG every bulk INSERT would stay in connection.queries.
+        reset_queries()
+        self.stats["created"] += len(created)
+        self.stats["updated"] += len(changed)
+        self.stats["unchanged" if self.upsert else "skipped"] += len(existing) - len(changed)
+
+    def _question(self, quiz, item, **fields):
+        options = item["options"]
+        return Question(
+            quiz=quiz,
+            text=item["question"],
+            option_a=options["A"],
+            option_b=options["B"],
+            option_c=options["C"],
+            option_d=options["D"],
+            correct_answer=item["answer"],
+            **fields,
+        )
+
+    def _changed(self, batch, existing):
+        """Questions whose stored text, options or answer differ from the import, ready to save."""
+        current = Question.objects.filter(id__in=existing.values()).values_list("id", *UPDATE_FIELDS[:-1])
+        current = {row[0]: row[1:] for row in current}
+        now = timezone.now()
+        changed = []
+        for text_hash, question_id in existing.items():
+            quiz, item, _ = batch[text_hash]
+            question = self._question(quiz, item, id=question_id, updated_at=now)
+            if tuple(getattr(question, field) for field in UPDATE_FIELDS[:-1]) != current.get(question_id):
+                changed.append(question)
+        return changed
+
@@ -1,20 +1,76 @@
-import os
+import asyncio
+import hashlib
 import json
-from dotenv import load_dotenv
-from openai import OpenAI
-from django.http import JsonResponse
+import logging
+import queue
+import time
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from . import admission, chat_cache
+from .llm_client import get_async_llm_client, run_coroutine
+from .quiz_parser import parse_quiz_items, validate_item
 
-# Load environment variables
-load_dotenv()
-API_KEY = os.getenv("OPENROUTER_API_KEY")
+logger = logging.getLogger(__name__)
 
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=API_KEY
-)
+# Large quizzes are generated as several smaller prompts running side by side.
+# Each chunk gets one of these angles so the chunks don't repeat each other.
+DIVERSITY_HINTS = [
+    "core definitions and key concepts",
+    "applying the concepts to short practical problems",
+    "common mistakes and misconceptions",
+    "comparisons between related ideas",
+    "important rules, facts and formulas",
+    "less obvious details and edge cases",
+]
 
-def generate_quiz_questions(category, subcategory, num_questions=5, difficulty="Easy"):
+
+def _chunk_sizes(num_questions):
+    chunk_size = max(1, getattr(settings, "QUIZ_CHUNK_SIZE", 5))
+    sizes = [chunk_size] * (num_questions // chunk_size)
+    if num_questions % chunk_size:
+        sizes.append(num_questions % chunk_size)
+    return sizes
+
+
+def _diversity_hint(index, total):
+    angle = DIVERSITY_HINTS[index % len(DIVERSITY_HINTS)]
+    return (
+        f"This is part {index + 1} of {total} of a larger quiz. "
+        f"Focus on {angle}, so the questions do not overlap with the other parts."
+    )
+
+
+def _question_key(item):
+    if not isinstance(item, dict):
+        return None
+    return " ".join(str(item.get("question", "")).lower().split()) or None
+
+
+def _chunk_workers(num_chunks):
+    return max(1, min(getattr(settings, "QUIZ_CHUNK_WORKERS", 6), num_chunks))
+
+
+def _refill_rounds():
+    return max(0, getattr(settings, "QUIZ_REFILL_ROUNDS", 1))
+
+
+def _round_hint(offset, index, total):
+    # The first round of a one-chunk request needs no hint; refill rounds
+    # get angles the earlier chunks did not use.
+    if not offset and total == 1:
+        return None
+    return _diversity_hint(offset + index, offset + total)
+
+
+def _valid_items(items, source):
+    valid = [v for v in map(validate_item, items) if v]
+    if len(valid) < len(items):
+        logger.warning("Dropped %d malformed items from %s", len(items) - len(valid), source)
+    return valid
+
+
+def build_quiz_prompt(category, subcategory, num_questions=5, difficulty="Easy", hint=None):
     prompt = f"""
     You are an AI Quiz Generator. Generate {num_questions} multiple-choice questions
     for category '{category}' and subcategory '{subcategory}'.
@@ -29,57 +85,421 @@ def generate_quiz_questions(category, subcategory, num_questions=5, difficulty="
       }}
     ]
     """
+    if hint:
+        prompt += f"\n    {hint}\n"
+    return prompt
+
+
+def _quiz_messages(prompt):
+    return [
+        {"role": "system", "content": "You are a helpful quiz generator AI."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+async def _generate_chunk(category, subcategory, num_questions, difficulty, hint=None):
+    prompt = build_quiz_prompt(category, subcategory, num_questions, difficulty, hint)
 
     try:
-        completion = client.chat.completions.create(
-            model="google/gemini-flash-1.5",   # ✅ verified slug
-            messages=[
-                {"role": "system", "content": "You are a helpful quiz generator AI."},
-                {"role": "user", "content": prompt}
-            ],
+        completion = await get_async_llm_client().chat_completion(
+            operation="quiz",
+            messages=_quiz_messages(prompt),
             response_format={"type": "json_object"}  # ✅ force JSON
         )
 
         content = completion.choices[0].message.content
-        return json.loads(content)
+        # Wrapped / fenced / truncated output is salvaged item by item
+        return _valid_items(parse_quiz_items(content), "generated quiz")
 
     except Exception as e:
-        print("Error generating quiz:", e)
+        logger.warning("Error generating quiz: %s", e)
         return []
 
+
+async def _generate_round(category, subcategory, num_questions, difficulty, offset):
+    sizes = _chunk_sizes(num_questions)
+    limit = asyncio.Semaphore(_chunk_workers(len(sizes)))
+
+    async def run_chunk(i, size):
+        async with limit:
+            return await _generate_chunk(
+                category, subcategory, size, difficulty, _round_hint(offset, i, len(sizes))
+            )
+
+    results = await asyncio.gather(*(run_chunk(i, size) for i, size in enumerate(sizes)))
+    return [item for chunk in results for item in chunk], len(sizes)
+
+
+async def agenerate_quiz_questions(category, subcategory, num_questions=5, difficulty="Easy"):
+    """
+    Generate ``num_questions`` questions. Counts above QUIZ_CHUNK_SIZE are split
+    into chunks that run concurrently (at most QUIZ_CHUNK_WORKERS at a time);
+    the merged result is validated and de-duplicated on question text. If
+    items were dropped, only the missing count is asked for again, for up to
+    QUIZ_REFILL_ROUNDS more rounds.
+    """
+    started = time.monotonic()
+    questions, seen = [], set()
+    offset = rounds = 0
+    while len(questions) < num_questions and rounds <= _refill_rounds():
+        before = len(questions)
+        items, chunks = await _generate_round(
+            category, subcategory, num_questions - len(questions), difficulty, offset
+        )
+        offset += chunks
+        rounds += 1
+        for item in items:
+            key = _question_key(item)
+            if key in seen:
+                continue
+            seen.add(key)
+            questions.append(item)
+        if len(questions) == before:
+            break   # nothing usable came back; another round is unlikely to help
+
+    logger.info(
+        "Generated %d/%d questions for %s/%s in %d chunks in %.2fs",
+        len(questions), num_questions, category, subcategory, offset,
+        time.monotonic() - started,
+    )
+    return questions
+
+
+def generate_quiz_questions(category, subcategory, num_questions=5, difficulty="Easy"):
+    """Blocking agenerate_quiz_questions, for sync callers (runs on the shared LLM loop)."""
+    return run_coroutine(agenerate_quiz_questions(category, subcategory, num_questions, difficulty)).result()
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for a JSON array of objects arriving in chunks.
+
+    ``feed()`` returns every top-level object of the first array in the text
+    as soon as its closing brace arrives, so callers can use item 0 while the
+    rest is still being generated. Text before the array (e.g. an object
+    wrapper like ``{"questions": [``) is skipped, and so is everything after
+    it, further arrays included.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._done = False
+        self._depth = 0          # nesting depth inside the current item
+        self._in_string = False
+        self._escape = False
+        self._item = []
+
+    def feed(self, chunk):
+        items = []
+        if self._done:
+            return items
+        for ch in chunk:
+            if self._in_string:
+                if self._depth:
+                    self._item.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth:
+                    self._item.append(ch)
+            elif not self._in_array:
+                if ch == "[":
+                    self._in_array = True
+            elif ch in "{[":
+                self._depth += 1
+                self._item.append(ch)
+            elif ch in "}]":
+                if not self._depth:
+                    if ch == "]":
+                        self._done = True   # array finished; ignore the rest
+                        break
+                    continue
+                self._depth -= 1
+                self._item.append(ch)
+                if not self._depth:
+                    text = "".join(self._item)
+                    self._item = []
+                    try:
+                        items.append(json.loads(text))
+                    except ValueError:
+                        pass
+            elif self._depth:
+                self._item.append(ch)
+        return items
+
+
+async def _stream_chunk(category, subcategory, num_questions, difficulty, hint=None):
+    prompt = build_quiz_prompt(category, subcategory, num_questions, difficulty, hint)
+    parser = JSONArrayStream()
+    parts = []
+    streamed = set()
+
+    try:
+        stream = await get_async_llm_client().chat_completion(
+            operation="quiz_stream",
+            messages=_quiz_messages(prompt),
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                for item in parser.feed(delta):
+                    streamed.add(_question_key(item))
+                    for valid in _valid_items([item], "streamed quiz"):
+                        yield valid
+
+    except Exception as e:
+        logger.warning("Error streaming quiz: %s", e)
+
+    # Whatever the incremental parser could not use (a bare object, a
+    # truncated last item) may still be salvageable from the full text. The
+    # two parsers need not agree on positions, so match items on their text.
+    leftover = [item for item in parse_quiz_items("".join(parts)) if _question_key(item) not in streamed]
+    for valid in _valid_items(leftover, "streamed quiz"):
+        yield valid
+
+
+async def _stream_round(category, subcategory, num_questions, difficulty, offset):
+    """Stream the chunks of one round concurrently, items interleaved in arrival order."""
+    sizes = _chunk_sizes(num_questions)
+    if len(sizes) <= 1:
+        async for item in _stream_chunk(
+            category, subcategory, num_questions, difficulty, _round_hint(offset, 0, 1)
+        ):
+            yield item
+        return
+
+    arrived = asyncio.Queue()
+    finished = object()
+    limit = asyncio.Semaphore(_chunk_workers(len(sizes)))
+
+    async def run_chunk(size, hint):
+        try:
+            async with limit:
+                async for item in _stream_chunk(category, subcategory, size, difficulty, hint):
+                    arrived.put_nowait(item)
+        finally:
+            arrived.put_nowait(finished)
+
+    tasks = [
+        asyncio.create_task(run_chunk(size, _round_hint(offset, i, len(sizes))))
+        for i, size in enumerate(sizes)
+    ]
+    try:
+        pending = len(sizes)
+        while pending:
+            item = await arrived.get()
+            if item is finished:
+                pending -= 1
+                continue
+            yield item
+    finally:
+        # Consumer stopped early: don't keep generating for nobody.
+        for task in tasks:
+            task.cancel()
+
+
+async def astream_quiz_questions(category, subcategory, num_questions=5, difficulty="Easy"):
+    """
+    Like agenerate_quiz_questions, but yield each question as soon as it is
+    complete and valid. Chunks stream concurrently and are interleaved in
+    arrival order; refill rounds for dropped items follow the first round.
+    """
+    started = time.monotonic()
+    yielded, seen = 0, set()
+    offset = rounds = 0
+    while yielded < num_questions and rounds <= _refill_rounds():
+        before = yielded
+        items = _stream_round(category, subcategory, num_questions - yielded, difficulty, offset)
+        offset += len(_chunk_sizes(num_questions - yielded))
+        rounds += 1
+        try:
+            async for item in items:
+                key = _question_key(item)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yielded += 1
+                yield item
+        finally:
+            await items.aclose()
+        if yielded == before:
+            break
+
+    logger.info(
+        "Streamed %d/%d questions for %s/%s in %d chunks in %.2fs",
+        yielded, num_questions, category, subcategory, offset,
+        time.monotonic() - started,
+    )
+
+
+def stream_quiz_questions(category, subcategory, num_questions=5, difficulty="Easy"):
+    """
+    Blocking iterator over astream_quiz_questions, for the generation jobs.
+    The LLM calls run on the shared LLM loop, not on threads of their own.
+    """
+    arrived = queue.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            async for item in astream_quiz_questions(category, subcategory, num_questions, difficulty):
+                arrived.put(item)
+        finally:
+            arrived.put(finished)
+
+    future = run_coroutine(pump())
+    try:
+        while True:
+            item = arrived.get()
+            if item is finished:
+                break
+            yield item
+    finally:
+        future.cancel()
+
 if __name__ == "__main__":
     questions = generate_quiz_questions("Mathematics", "Algebra", num_questions=3, difficulty="Medium")
     print(json.dumps(questions, indent=4))
 
 
-@csrf_exempt
-def chat_response(request):
-    if request.method == "POST":
-        data = json.loads(request.body)
-        user_message = data.get("message", "")
-
-        # System prompt to restrict AI to app queries
-        system_prompt = """
+# System prompt to restrict AI to app queries
+CHAT_SYSTEM_PROMPT = """
         You are a helpful AI assistant for QuizGen app. 
         Answer only questions related to quiz categories, 
         quiz generation, user history, or profile.
         For unrelated queries, politely respond:
         'I can only answer questions related to QuizGen app.'
         """
+# Part of the answer cache key: editing the prompt starts a fresh cache.
+CHAT_PROMPT_VERSION = hashlib.sha1(CHAT_SYSTEM_PROMPT.encode()).hexdigest()[:8]
+CHAT_ERROR = "Sorry, I couldn't process your request."
+
+
+def _chat_messages(user_message):
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message}
+    ]
+
+
+@csrf_exempt
+async def chat_response(request):
+    if request.method == "POST":
+        data = json.loads(request.body)
+        user_message = data.get("message", "")
+
+        cached = await chat_cache.lookup(user_message, CHAT_PROMPT_VERSION)
+        if cached is not None:
+            return JsonResponse({"response": cached})
 
         try:
-            completion = client.chat.completions.create(
-                model="google/gemini-flash-1.5",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                
+            admission.check_user(admission.client_key(request, await request.auser()))
+            started = time.monotonic()
+            completion = await get_async_llm_client().chat_completion(
+                operation="chat",
+                messages=_chat_messages(user_message),
             )
 
             content = completion.choices[0].message.content
+            chat_cache.store(user_message, CHAT_PROMPT_VERSION, content, time.monotonic() - started)
 
             return JsonResponse({"response": content})
 
+        except admission.AdmissionRejected as e:
+            return admission.rejection_response(e)
         except Exception as e:
-            return JsonResponse({"response": "Sorry, I couldn't process your request."})
\ No newline at end of file
+            return JsonResponse({"response": CHAT_ERROR})
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@csrf_exempt
+async def chat_stream(request):
+    """
+    Streaming chat_response: Server-Sent Events with one ``token`` event per
+    delta, then ``done`` (or ``error``). Admission is checked before the
+    response starts, so a shed request still gets a plain 429/503; the
+    upstream call is only opened once the body is iterated, so a client that
+    disconnects early never holds a slot. If the client goes away mid-answer
+    the upstream stream is closed, so generation stops.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+    data = json.loads(request.body)
+    user_message = data.get("message", "")
+
+    cached = await chat_cache.lookup(user_message, CHAT_PROMPT_VERSION)
+    if cached is not None:
+        return _event_stream(_cached_events(cached))
+
+    try:
+        admission.check_user(admission.client_key(request, await request.auser()))
+        admission.get_limiter().check_queue()
+    except admission.AdmissionRejected as e:
+        return admission.rejection_response(e)
+
+    async def events():
+        started = time.monotonic()
+        try:
+            stream = await get_async_llm_client().chat_completion(
+                operation="chat_stream",
+                messages=_chat_messages(user_message),
+                stream=True,
+            )
+        except admission.AdmissionRejected as e:
+            # Queued behind a full limiter after the headers went out
+            yield _sse("error", {"response": str(e), "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            logger.warning("Error streaming chat: %s", e)
+            yield _sse("error", {"response": CHAT_ERROR})
+            return
+
+        parts = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield _sse("token", {"text": delta})
+            # Only complete answers are cached
+            chat_cache.store(user_message, CHAT_PROMPT_VERSION, "".join(parts), time.monotonic() - started)
+            yield _sse("done", {})
+        except asyncio.CancelledError:
+            logger.info("Chat stream cancelled by the client")
+            raise
+        except Exception as e:
+            logger.warning("Error streaming chat: %s", e)
+            yield _sse("error", {"response": CHAT_ERROR})
+        finally:
+            await stream.close()
+
+    return _event_stream(events())
+
+
+async def _cached_events(answer):
+    yield _sse("token", {"text": answer})
+    yield _sse("done", {})
+
+
+def _event_stream(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"   # don't let nginx buffer the events
+    return response
@@ -0,0 +1,136 @@
+"""
+Tolerant parsing of LLM quiz output.
+
+Models asked for a JSON array of questions answer with a bare array, an
+object wrapping it (``{"questions": [...]}``, what ``response_format=
+json_object`` tends to produce), a single question object, Markdown code
+fences around any of those, or output cut off mid-item when they hit the
+token limit. ``parse_quiz_items`` recovers every complete item from all of
+these, and ``validate_item`` checks one item and normalizes it to the
+``{"question", "options": {"A".."D"}, "answer"}`` shape, so one bad item
+costs that item, not the whole response.
+"""
+import json
+import re
+
+from ..models import Question
+
+LABELS = ["A", "B", "C", "D"]
+# Longer options would fail the bulk insert (Postgres enforces varchar length)
+OPTION_MAX_LENGTH = Question._meta.get_field("option_a").max_length
+
+_FENCE = re.compile(r"```[\w-]*[ \t]*\n?(.*?)(?:```|$)", re.S)
+_LABEL = re.compile(r"^(?:option\s+)?\(?([A-D])\)?(?:[.):\s]|$)", re.I)
+
+
+def strip_fences(text):
+    """The body of the first Markdown code fence in ``text``, or ``text`` itself."""
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def _repair(text):
+    """
+    Close truncated JSON: cut back to the last complete value and append the
+    missing closing brackets. Returns None if there is nothing to salvage.
+    """
+    start = min((i for i in (text.find("["), text.find("{")) if i >= 0), default=-1)
+    if start < 0:
+        return None
+    stack = []
+    safe = None          # (end index, open brackets) after the last complete value
+    in_string = escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "[{":
+            stack.append("]" if ch == "[" else "}")
+        elif ch in "]}":
+            if not stack:
+                break
+            stack.pop()
+            safe = (i + 1, list(stack))
+            if not stack:
+                return text[start:i + 1]
+        elif ch == ",":
+            safe = (i, list(stack))
+    if safe is None:
+        return None
+    end, still_open = safe
+    return text[start:end] + "".join(reversed(still_open))
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    repaired = _repair(text)
+    if repaired is None:
+        return None
+    try:
+        return json.loads(repaired)
+    except ValueError:
+        return None
+
+
+def _items(data):
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        if "question" in data:
+            return [data]
+        # {"questions": [...]}, {"quiz": {"items": [...]}}, ...
+        for value in data.values():
+            items = _items(value)
+            if items:
+                return items
+    return []
+
+
+def parse_quiz_items(text):
+    """Every complete question item in LLM output ``text`` (unvalidated)."""
+    if not text:
+        return []
+    return _items(_loads(strip_fences(str(text)).strip()))
+
+
+def _answer_label(answer, options):
+    answer = str(answer).strip()
+    # Some models give the answer text instead of its label.
+    for label, value in options.items():
+        if answer.lower() == value.lower():
+            return label
+    match = _LABEL.match(answer)
+    return match.group(1).upper() if match else None
+
+
+def validate_item(item):
+    """``item`` normalized to the bank shape, or None if it is not a usable question."""
+    if not isinstance(item, dict):
+        return None
+    text = str(item.get("question") or "").strip()
+    options = item.get("options")
+    if isinstance(options, list) and len(options) == len(LABELS):
+        options = dict(zip(LABELS, options))
+    if not text or not isinstance(options, dict):
+        return None
+    options = {str(k).strip().upper(): v for k, v in options.items()}
+    if any(not isinstance(options.get(label), (str, int, float)) for label in LABELS):
+        return None
+    options = {label: str(options[label]).strip() for label in LABELS}
+    if not all(options.values()) or any(len(option) > OPTION_MAX_LENGTH for option in options.values()):
+        return None
+    answer = _answer_label(item.get("answer", item.get("correct_answer", "")), options)
+    if answer is None:
+        return None
+    return {"question": text, "options": options, "answer": answer}
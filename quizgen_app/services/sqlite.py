@@ -0,0 +1,57 @@
+"""
+Production SQLite mode.
+
+With ``settings.SQLITE_PRODUCTION`` on, ``settings.SQLITE_PRAGMAS`` is
+applied to every new SQLite connection. journal_mode=WAL is persistent in
+the database file; the rest are per connection, hence the hook. busy_timeout
+is applied in every mode: the threaded runserver and the background
+generation threads write concurrently too.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Pragmas whose values are keywords rather than numbers.
+KEYWORD_PRAGMAS = {"journal_mode", "synchronous", "temp_store"}
+# Applied even without SQLITE_PRODUCTION.
+ALWAYS_APPLIED = {"busy_timeout"}
+
+
+def pragma_statements(pragmas):
+    statements = []
+    for name, value in pragmas.items():
+        if name in KEYWORD_PRAGMAS:
+            value = str(value).upper()
+            if not value.isalpha():
+                raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+        else:
+            value = int(value)
+        statements.append(f"PRAGMA {name} = {value}")
+    return statements
+
+
+@receiver(connection_created, dispatch_uid="sqlite_production_pragmas")
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    if not getattr(settings, "SQLITE_PRODUCTION", False):
+        pragmas = {name: value for name, value in pragmas.items() if name in ALWAYS_APPLIED}
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+def checkpoint(connection, mode="TRUNCATE"):
+    """``PRAGMA wal_checkpoint(mode)`` -> (busy, wal pages, checkpointed pages)."""
+    mode = mode.upper()
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Unknown checkpoint mode {mode!r}")
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+        return tuple(cursor.fetchone())
+
+
+def optimize(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA optimize")
@@ -0,0 +1,137 @@
+"""
+Per-user and per-user-per-category quiz stats.
+
+``record_completion`` is called in the same transaction that marks a
+QuizHistory completed, so the dashboard and profile pages can read one or
+two rows instead of aggregating the whole history. ``rebuild_stats``
+recomputes everything from QuizHistory (see ``manage.py rebuild_user_stats``).
+"""
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Sum
+from django.utils import timezone
+
+from ..models import QuizHistory, UserCategoryStats, UserStats
+
+
+def _add(stats, history):
+    stats.quiz_count += 1
+    stats.score_sum += history.score
+    stats.best_score = max(stats.best_score, history.score)
+    stats.correct_sum += history.correct_answers
+    stats.total_sum += history.total_questions
+    if history.started_at and history.completed_at:
+        stats.duration_sum += history.completed_at - history.started_at
+
+
+def next_streak(last_active, current_streak, day):
+    """Streak after completing a quiz on ``day`` (never earlier than ``last_active``)."""
+    if last_active is None:
+        return 1
+    gap = (day - last_active).days
+    if gap <= 0:
+        return current_streak
+    if gap == 1:
+        return current_streak + 1
+    return 1
+
+
+def record_completion(history):
+    """Fold a just-completed ``history`` into its user's stats rows. Call inside a transaction."""
+    user_stats, _ = UserStats.objects.select_for_update().get_or_create(user_id=history.user_id)
+    day = timezone.localdate(history.completed_at)
+    user_stats.current_streak = next_streak(user_stats.last_active, user_stats.current_streak, day)
+    user_stats.last_active = max(day, user_stats.last_active or day)
+    _add(user_stats, history)
+    user_stats.save()
+
+    category_stats, _ = UserCategoryStats.objects.select_for_update().get_or_create(
+        user_id=history.user_id, category_id=history.quiz.category_id
+    )
+    _add(category_stats, history)
+    category_stats.save()
+    return user_stats
+
+
+def get_user_stats(user):
+    return UserStats.objects.filter(user=user).first() or UserStats(user=user)
+
+
+def _totals(qs, *group_by):
+    duration = ExpressionWrapper(F("completed_at") - F("started_at"), output_field=DurationField())
+    return (
+        qs.values(*group_by)
+        .annotate(
+            quiz_count=Count("id"),
+            score_sum=Sum("score"),
+            best_score=Max("score"),
+            correct_sum=Sum("correct_answers"),
+            total_sum=Sum("total_questions"),
+            duration_sum=Sum(duration),
+        )
+        .order_by(*group_by)
+    )
+
+
+def _fill(stats, row):
+    for field in ("quiz_count", "score_sum", "best_score", "correct_sum", "total_sum"):
+        setattr(stats, field, row[field] or 0)
+    stats.duration_sum = row["duration_sum"] or timedelta()
+    return stats
+
+
+def _streak(days):
+    """(last active day, streak ending on it) from completion days, newest first."""
+    streak_days = 0
+    last_date = None
+    for d in days:
+        if last_date is None:
+            streak_days = 1
+            last_date = d
+        elif (last_date - d).days == 1:
+            streak_days += 1
+            last_date = d
+        elif last_date == d:
+            continue
+        else:
+            break
+    return (days[0] if days else None), streak_days
+
+
+def rebuild_stats(user_ids=None, batch_size=1000):
+    """Recompute stats from completed QuizHistory rows, for all users or ``user_ids``."""
+    completed = QuizHistory.objects.filter(completed_at__isnull=False)
+    if user_ids is not None:
+        completed = completed.filter(user_id__in=user_ids)
+
+    # Streaks need the completion days per user, newest first.
+    streaks = {}
+    days = completed.order_by("user_id", "-completed_at").values_list("user_id", "completed_at")
+    for user_id, rows in groupby(days.iterator(chunk_size=batch_size), key=itemgetter(0)):
+        streaks[user_id] = _streak([timezone.localdate(completed_at) for _, completed_at in rows])
+
+    user_rows = []
+    for row in _totals(completed, "user_id").iterator(chunk_size=batch_size):
+        stats = _fill(UserStats(user_id=row["user_id"]), row)
+        stats.last_active, stats.current_streak = streaks[row["user_id"]]
+        user_rows.append(stats)
+
+    category_rows = [
+        _fill(UserCategoryStats(user_id=row["user_id"], category_id=row["quiz__category_id"]), row)
+        for row in _totals(completed, "user_id", "quiz__category_id").iterator(chunk_size=batch_size)
+    ]
+
+    with transaction.atomic():
+        stale_users = UserStats.objects.all()
+        stale_categories = UserCategoryStats.objects.all()
+        if user_ids is not None:
+            stale_users = stale_users.filter(user_id__in=user_ids)
+            stale_categories = stale_categories.filter(user_id__in=user_ids)
+        stale_users.delete()
+        stale_categories.delete()
+        UserStats.objects.bulk_create(user_rows, batch_size=batch_size)
+        UserCategoryStats.objects.bulk_create(category_rows, batch_size=batch_size)
+    return len(user_rows), len(category_rows)
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by submit_quiz_view, inside the submit transaction, once a quiz attempt
+# has been completed and folded into the user's stats.
+# Arguments: history (QuizHistory), stats (UserStats).
+quiz_completed = Signal()
@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from .services.quiz_api import chat_response
+from .services.quiz_api import chat_response, chat_stream
 urlpatterns = [
     path("register/", views.register_view, name="register"),
     path("login/", views.login_view, name="login"),
@@ -12,11 +12,15 @@ urlpatterns = [
     path("history/", views.history_view, name="history"),
     path("quiz/play/", views.quiz_play_view, name="quiz_play"),
     path("quiz/get/<int:index>/", views.get_question_view, name="get_question"),
+    path("quiz/questions/", views.quiz_questions_view, name="quiz_questions"),
+    path("quiz/job/<int:job_id>/", views.job_status_view, name="job_status"),
     path("quiz/submit/", views.submit_quiz_view, name="submit_quiz"),
     path("categories/", views.categories_view, name="categories"),
    #  path("performance/", views.performance_view, name="performance"),
     path("profile/", views.profile_view, name="profile"),
     path("chat/", chat_response, name="chat_response"),
+    path("chat/stream/", chat_stream, name="chat_stream"),
+    path("metrics/", views.metrics_view, name="metrics"),
 
 
 ]
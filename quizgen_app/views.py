@@ -1,95 +1,167 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
-from django.db.models import Avg, Count, F, Sum, Max
-from django.db.models.functions import Coalesce
-from .forms import RegisterForm, LoginForm, ProfileForm
-from .models import Category, Quiz, SubCategory, QuizHistory, UserAnswer
-from .services.quiz_api import generate_quiz_questions
-import random
+from django.utils.cache import get_conditional_response, patch_cache_control
+from .forms import RegisterForm, LoginForm, HistoryFilterForm
+from .models import Category, SubCategory, QuizHistory, UserAnswer, GenerationJob, AttemptQuestion, UserCategoryStats
+from .services.question_bank import get_bank_quiz, present_question, original_label
+from .services.jobs import enqueue_generation
+from .services.stats import get_user_stats, record_completion
+from .services.badges import get_user_badges
+from .services.page_cache import cached_for_user
+from .services.history import filtered_history, history_page
+from .services.admission import AdmissionRejected, check_user, client_key, get_limiter, rejection_response
+from .services.metrics import render_prometheus
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.crypto import constant_time_compare
+from .signals import quiz_completed
 from django.db import transaction
-from django.db.models import F, ExpressionWrapper, DurationField, Avg, Max
-from datetime import timedelta
-from django.core.paginator import Paginator
 
 # ---------------- QUIZ GENERATION ----------------
 
 
 @login_required
-def generate_quiz_view(request, category_id, subcategory_id, level, count):
-    category = get_object_or_404(Category, id=category_id)
-    subcategory = get_object_or_404(SubCategory, id=subcategory_id)
-
-    # AI se questions lao
-    questions = generate_quiz_questions(
-        category.name,
-        subcategory.name,
-        num_questions=count,
-        difficulty=level
-    )
+async def generate_quiz_view(request, category_id, subcategory_id, level, count):
+    user = await request.auser()
+
+    # Zyada requests ya LLM queue full ho to abhi mana kar do (429/503)
+    try:
+        check_user(client_key(request, user))
+        get_limiter().check_queue()
+    except AdmissionRejected as e:
+        return rejection_response(e, as_json=False)
 
-    # ---------------------- FIXED SHUFFLE ----------------------
-    for q in questions:
-        # Original correct answer text
-        correct_text = q["options"][q["answer"]]
+    category = await aget_object_or_404(Category, id=category_id)
+    subcategory = await aget_object_or_404(SubCategory, id=subcategory_id)
 
-        # Option texts ko shuffle karo
-        values = list(q["options"].values())
-        random.shuffle(values)
+    # Transaction async me nahi chalta, isliye yeh hissa sync thread me
+    history = await sync_to_async(_start_attempt)(user, category, subcategory, level, count)
 
-        # Map shuffled values back to fixed labels A,B,C,D
-        q["options"] = {label: text for label, text in zip(["A","B","C","D"], values)}
+    # Session me sirf attempt id store karo
+    await request.session.aset("attempt_id", history.id)
+
+    return redirect("quiz_play")
 
-        # Update correct answer label
-        for label, text in q["options"].items():
-            if text == correct_text:
-                q["answer"] = label
-                break
-    # ---------------------- FIXED SHUFFLE END ----------------------
 
+def _start_attempt(user, category, subcategory, level, count):
     with transaction.atomic():
-        # Quiz create karo
-        quiz = Quiz.objects.create(
-            title=f"AI Quiz - {subcategory.name} ({level})",
-            subcategory=subcategory,
-            category=category,
-            description=f"AI generated quiz in {subcategory.name}",
-            difficulty=level,
-        )
+        # Bank quiz lo (har subcategory + level ka ek)
+        quiz = get_bank_quiz(category, subcategory, level)
 
         # History create karo
         history = QuizHistory.objects.create(
-            user=request.user,
+            user=user,
             quiz=quiz,
             total_questions=count,
             started_at=timezone.now(),
         )
 
-    # Session me store karo
-    request.session["current_quiz"] = questions
-    request.session["quiz_meta"] = {"history_id": history.id}
+        # Questions background job me banenge
+        job = GenerationJob.objects.create(user=user, history=history, count=count)
+        enqueue_generation(job.id)
+    return history
 
-    return redirect("quiz_play")
 
+def _current_job(request):
+    attempt_id = request.session.get("attempt_id")
+    if not attempt_id:
+        return None
+    return GenerationJob.objects.filter(history_id=attempt_id, user=request.user).first()
 
 
 @login_required
 def quiz_play_view(request):
-    questions = request.session.get("current_quiz", [])
-    return render(request, "quiz_play.html", {"total": len(questions)})
+    job = _current_job(request)
+    if job is None:
+        return redirect("categories")
+    return render(request, "quiz_play.html", {"total": job.count, "job_id": job.id})
+
+
+@login_required
+async def job_status_view(request, job_id):
+    user = await request.auser()
+    job = await aget_object_or_404(GenerationJob, id=job_id, user=user)
+    return JsonResponse({
+        "status": job.status,
+        "ready": job.ready,
+        "total": job.ready if job.status == GenerationJob.DONE else job.count,
+        "error": job.error,
+    })
 
 
 @login_required
 def get_question_view(request, index):
-    questions = request.session.get("current_quiz", [])
-    if 0 <= index < len(questions):
-        return JsonResponse(questions[index], safe=False)
+    attempt_id = request.session.get("attempt_id")
+    item = (
+        AttemptQuestion.objects
+        .select_related("question")
+        .filter(history_id=attempt_id, history__user=request.user, position=index)
+        .first()
+    )
+    if item is not None:
+        return JsonResponse(_client_question(item), safe=False)
+
+    # Abhi generate ho raha hai - client thodi der baad retry kare
+    job = _current_job(request)
+    if job and job.status in (GenerationJob.QUEUED, GenerationJob.RUNNING) and 0 <= index < job.count:
+        response = JsonResponse({"status": "pending"}, status=202)
+        response["Retry-After"] = "1"
+        return response
     return JsonResponse({"error": "Invalid question index"}, status=400)
 
 
+QUESTION_WINDOW_MAX = 50
+
+
+def _client_question(item):
+    """What the player may see of an AttemptQuestion: no answer key."""
+    q = present_question(item.question, item.seed)
+    return {"index": item.position, "question": q["question"], "options": q["options"]}
+
+
+@login_required
+def quiz_questions_view(request):
+    """
+    Questions ``start`` .. ``start + limit - 1`` of the current attempt in one
+    response, without answers. Revalidated through an ETag, so a refresh of
+    an unchanged window is a 304.
+    """
+    job = _current_job(request)
+    if job is None:
+        return JsonResponse({"error": "No quiz in progress"}, status=400)
+
+    try:
+        start = max(int(request.GET.get("start", 0)), 0)
+        limit = min(max(int(request.GET.get("limit", 10)), 1), QUESTION_WINDOW_MAX)
+    except ValueError:
+        return JsonResponse({"error": "Invalid window"}, status=400)
+
+    # Window ka content sirf (attempt, start, limit, ready-in-window, status) par depend karta hai
+    in_window = max(min(job.ready, start + limit) - start, 0)
+    etag = f'"{job.history_id}-{start}-{limit}-{in_window}-{job.status}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        items = (
+            AttemptQuestion.objects
+            .select_related("question")
+            .filter(history_id=job.history_id, position__gte=start, position__lt=start + limit)
+        )
+        response = JsonResponse({
+            "status": job.status,
+            "ready": job.ready,
+            "total": job.ready if job.status == GenerationJob.DONE else job.count,
+            "questions": [_client_question(item) for item in items],
+        })
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 # ---------------- AUTH ----------------
 def register_view(request):
     if request.method == "POST":
@@ -131,20 +203,30 @@ def logout_view(request):
 def dashboard_view(request):
     user = request.user
 
+    # ---- User ka data cache se (submit pe version badalta hai) ----
+    context = cached_for_user(user.id, "dashboard", lambda: _dashboard_context(user))
+
     # ---- Categories for quick-start dropdown ----
-    categories = Category.objects.prefetch_related("subcategories").all()
+    context["categories"] = Category.objects.prefetch_related("subcategories").all()
 
+    return render(request, "dashboard.html", context)
+
+
+def _dashboard_context(user):
     # ---- Base queryset for user's quiz histories ----
-    user_hist_qs = QuizHistory.objects.filter(user=user).exclude(completed_at__isnull=True)
+    user_hist_qs = QuizHistory.objects.filter(user=user, completed_at__isnull=False)
 
-    # ---- Aggregate stats ----
-    total_quizzes = user_hist_qs.count()
-    stats = user_hist_qs.aggregate(avg_score=Avg("score"), best_score=Max("score"))
-    avg_score = stats["avg_score"] or 0
-    best_score = stats["best_score"] or 0
+    # ---- Aggregate stats (maintained on submit, see services/stats.py) ----
+    stats = get_user_stats(user)
+    category_stats = list(
+        UserCategoryStats.objects.filter(user=user).select_related("category").order_by("-quiz_count")
+    )
+    total_quizzes = stats.quiz_count
+    avg_score = stats.avg_score
+    best_score = stats.best_score
 
     # ---- Recent history (limit 5 for dashboard) ----
-    recent_history = user_hist_qs.order_by("-completed_at")[:5]
+    recent_history = list(user_hist_qs.select_related("quiz").order_by("-completed_at")[:5])
     # Add status color for template
     for h in recent_history:
         if h.score >= 80:
@@ -154,60 +236,29 @@ def dashboard_view(request):
         else:
             h.status_color = "bg-red-100 text-red-700"
 
-    # ---- Streak calculation ----
-    streak_days = 0
-    last_date = None
-    for h in user_hist_qs.order_by("-completed_at"):
-        d = h.completed_at.date()
-        if last_date is None:
-            streak_days = 1
-            last_date = d
-        elif (last_date - d).days == 1:
-            streak_days += 1
-            last_date = d
-        elif last_date == d:
-            continue
-        else:
-            break
+    # ---- Streak ----
+    streak_days = stats.current_streak
 
     # ---- Category performance for dashboard cards ----
-    category_performance_qs = (
-        user_hist_qs
-        .values("quiz__category__id", "quiz__category__name")
-        .annotate(avg_score=Avg("score"), quizzes=Count("id"))
-        .order_by("-quizzes")
-    )
-
     colors = ["card-color-1","card-color-2","card-color-3","card-color-4","card-color-5","card-color-6"]
     final_category_performance = []
-    for i, c in enumerate(category_performance_qs):
-        avg = c.get("avg_score") or 0
+    for i, c in enumerate(category_stats):
+        avg = c.avg_score
         status = "Strong" if avg >= 85 else "Good" if avg >= 70 else "Needs Work"
         final_category_performance.append({
-            "id": c["quiz__category__id"],
-            "name": c["quiz__category__name"],
+            "id": c.category_id,
+            "name": c.category.name,
             "score": round(avg, 2),
-            "quizzes": c["quizzes"],
+            "quizzes": c.quiz_count,
             "status": status,
             "color_class": colors[i % len(colors)]
         })
 
-    # ---- Badges ----
-    badges = []
-    if total_quizzes >= 1:
-        badges.append({"icon": "⭐", "name": "First Quiz", "description": "Completed your first quiz"})
-    if best_score >= 90:
-        badges.append({"icon": "🏆", "name": "High Scorer", "description": "Scored above 90%"})
-    if streak_days >= 3:
-        badges.append({"icon": "🔥", "name": "Streak Master", "description": f"{streak_days}-day streak"})
+    # ---- Badges (awarded on submit, see services/badges.py) ----
+    badges = get_user_badges(user)
 
     # ---- User attempts per category ----
-    user_attempts_per_category = (
-        user_hist_qs
-        .values("quiz__category__id")
-        .annotate(attempts=Count("id"))
-    )
-    attempts_dict = {item["quiz__category__id"]: item["attempts"] for item in user_attempts_per_category}
+    attempts_dict = {c.category_id: c.quiz_count for c in category_stats}
 
     # ---- Performance over time (last 7 attempts) ----
     perf = list(user_hist_qs.order_by("-started_at")[:7])  # list conversion
@@ -217,34 +268,28 @@ def dashboard_view(request):
 
 
     # ---- Category-wise performance for charts ----
-    cat_data = (
-        user_hist_qs.values("quiz__category__name")
-        .annotate(avg_score=Avg("score"))
-        .order_by("quiz__category__name")
-    )
-    category_labels = [c["quiz__category__name"] for c in cat_data]
-    category_scores = [round(c["avg_score"], 2) for c in cat_data]
+    cat_data = sorted(category_stats, key=lambda c: c.category.name)
+    category_labels = [c.category.name for c in cat_data]
+    category_scores = [round(c.avg_score, 2) for c in cat_data]
 
     # ---- Strongest & weakest subject ----
     if cat_data:
-        strongest = max(cat_data, key=lambda x: x["avg_score"])
-        weakest = min(cat_data, key=lambda x: x["avg_score"])
-        strongest_subject = strongest["quiz__category__name"]
-        strongest_score = round(strongest["avg_score"], 2)
-        weak_subject = weakest["quiz__category__name"]
+        strongest = max(cat_data, key=lambda x: x.avg_score)
+        weakest = min(cat_data, key=lambda x: x.avg_score)
+        strongest_subject = strongest.category.name
+        strongest_score = round(strongest.avg_score, 2)
+        weak_subject = weakest.category.name
     else:
         strongest_subject = weak_subject = "N/A"
         strongest_score = 0
 
     # ---- Accuracy rate & Avg time per question ----
-    total_correct = user_hist_qs.aggregate(total=Sum("correct_answers"))["total"] or 0
-    total_questions = user_hist_qs.aggregate(total=Sum("total_questions"))["total"] or 1
+    total_correct = stats.correct_sum
+    total_questions = stats.total_sum or 1
     accuracy_rate = round((total_correct / total_questions) * 100, 2)
 
     # Avg time per question
-    duration_data = user_hist_qs.annotate(
-        duration=ExpressionWrapper(F('completed_at') - F('started_at'), output_field=DurationField())
-    ).aggregate(avg_duration=Avg('duration'))['avg_duration']
+    duration_data = stats.duration_sum / stats.quiz_count if stats.quiz_count else None
     if duration_data:
         avg_time_per_question = round(duration_data.total_seconds() / total_questions, 2)
     else:
@@ -254,8 +299,7 @@ def dashboard_view(request):
     accuracy_improvement = 0  # compute dynamically if needed
 
     # ---- Final context ----
-    context = {
-        "categories": categories,
+    return {
         "recent_history": recent_history,
         "total_quizzes": total_quizzes,
         "avg_score": round(avg_score, 2),
@@ -276,8 +320,6 @@ def dashboard_view(request):
         "weak_subject": weak_subject,
     }
 
-    return render(request, "dashboard.html", context)
-
 
 
 
@@ -293,34 +335,50 @@ def categories_view(request):
 
 
 @login_required
-def start_quiz(request, cat, sub, level, count):
+async def start_quiz(request, cat, sub, level, count):
     """
     Redirects to generate_quiz_view with parameters.
     """
-    return generate_quiz_view(request, category_id=cat, subcategory_id=sub, level=level, count=count)
+    return await generate_quiz_view(request, category_id=cat, subcategory_id=sub, level=level, count=count)
 
 
 @login_required
 def history_view(request):
-    # Base queryset
-    history_list = QuizHistory.objects.filter(user=request.user).order_by("-completed_at")
-    
-    # Paginator
-    paginator = Paginator(history_list, 10)
-    page_number = request.GET.get("page")
-    history = paginator.get_page(page_number)
-    
-    # Dropdown data
-    categories = Category.objects.all()
-    subcategories = SubCategory.objects.all()
-    
+    # Filters server pe lagte hain (category, subcategory, difficulty, date range)
+    form = HistoryFilterForm(request.GET or None)
+
+    # Prev/Next links me filters same rehne chahiye, sirf cursor badle
+    params = request.GET.copy()
+    params.pop("after", None)
+    params.pop("before", None)
+
+    def build_table():
+        filters = form.cleaned_data if form.is_valid() else {}
+        qs = filtered_history(request.user, **{k: v for k, v in filters.items() if v})
+        page = history_page(qs, after=request.GET.get("after"), before=request.GET.get("before"))
+        return render_to_string("history_table.html", {
+            "history": page.rows,
+            "newer_url": _page_url(params, "before", page.newer),
+            "older_url": _page_url(params, "after", page.older),
+        })
+
+    # Table + pagination ka HTML cache se (submit pe version badalta hai)
+    history_table = cached_for_user(request.user.id, "history", build_table, request.GET.urlencode())
+
     return render(request, "history.html", {
-        "history": history,
-        "categories": categories,
-        "subcategories": subcategories,
+        "history_table": history_table,
+        "form": form if form.is_bound else HistoryFilterForm(),
     })
 
 
+def _page_url(params, name, cursor):
+    if not cursor:
+        return None
+    params = params.copy()
+    params[name] = cursor
+    return "?" + params.urlencode()
+
+
 def quiz_view(request, quiz_id):
     return HttpResponse(f"Quiz Page - quiz id: {quiz_id}")
 
@@ -329,24 +387,25 @@ def quiz_view(request, quiz_id):
 @login_required
 def submit_quiz_view(request):
     if request.method == "POST":
-        questions = request.session.get("current_quiz", [])
-        quiz_meta = request.session.get("quiz_meta", {})
+        job = _current_job(request)
 
-        if not quiz_meta:
+        if job is None or job.status != GenerationJob.DONE:
             return redirect("dashboard")
 
-        history_id = quiz_meta.get("history_id")
-        history = get_object_or_404(QuizHistory, id=history_id, user=request.user)
+        history = get_object_or_404(QuizHistory, id=job.history_id, user=request.user)
+        attempt = list(history.attempt_questions.select_related("question"))
 
         # Calculate result
-        total = len(questions)
+        total = len(attempt)
         correct = 0
         user_answers = request.POST
 
         results = []  # 👈 yeh add karo
+        answers = []
 
-        for i, q in enumerate(questions):
-            user_ans = user_answers.get(str(i))
+        for item in attempt:
+            q = present_question(item.question, item.seed)
+            user_ans = user_answers.get(str(item.position))
             is_correct = (user_ans == q["answer"])
             if is_correct:
                 correct += 1
@@ -359,17 +418,36 @@ def submit_quiz_view(request):
                 "is_correct": is_correct,
             })
 
+            # Answer ko question ke original label (A-D) me save karo,
+            # taaki next quiz me seen questions skip ho sakein
+            answers.append(UserAnswer(
+                history=history,
+                question=item.question,
+                selected_option=original_label(item.seed, user_ans),
+                is_correct=is_correct,
+            ))
+
         score = round((correct / total) * 100, 2)
 
         # Update history
         history.correct_answers = correct
         history.score = score
         history.completed_at = timezone.now()
-        history.save()
+
+        with transaction.atomic():
+            # Sirf pehli submit count ho (double POST se stats do baar na badhein)
+            completed = (
+                QuizHistory.objects
+                .filter(id=history.id, completed_at__isnull=True)
+                .update(correct_answers=correct, score=score, completed_at=history.completed_at)
+            )
+            if completed:
+                UserAnswer.objects.bulk_create(answers)
+                user_stats = record_completion(history)
+                quiz_completed.send(sender=QuizHistory, history=history, stats=user_stats)
 
         # Clear session
-        request.session.pop("current_quiz", None)
-        request.session.pop("quiz_meta", None)
+        request.session.pop("attempt_id", None)
 
         return render(request, "quiz_result.html", {
             "score": score,
@@ -385,72 +463,43 @@ def submit_quiz_view(request):
 @login_required
 def profile_view(request):
     user = request.user
-    user_hist_qs = QuizHistory.objects.filter(user=user).exclude(completed_at__isnull=True)
 
-    # Stats
-    total_quizzes = user_hist_qs.count()
-    avg_score = user_hist_qs.aggregate(Avg("score"))["score__avg"] or 0
-    best_score = user_hist_qs.aggregate(Max("score"))["score__max"] or 0
+    # Profile ka data cache se (submit / profile save pe version badalta hai)
+    context = cached_for_user(user.id, "profile", lambda: _profile_context(user))
+    context["user"] = user
+    return render(request, "profile.html", context)
+
+
+def _profile_context(user):
+    user_hist_qs = QuizHistory.objects.filter(user=user, completed_at__isnull=False)
+
+    # Stats (maintained on submit, see services/stats.py)
+    stats = get_user_stats(user)
+    category_stats = list(UserCategoryStats.objects.filter(user=user).select_related("category"))
+    total_quizzes = stats.quiz_count
+    avg_score = stats.avg_score
+    best_score = stats.best_score
 
     # Accuracy
-    total_correct = user_hist_qs.aggregate(Sum("correct_answers"))["correct_answers__sum"] or 0
-    total_questions = user_hist_qs.aggregate(Sum("total_questions"))["total_questions__sum"] or 1
+    total_correct = stats.correct_sum
+    total_questions = stats.total_sum or 1
     accuracy_rate = round((total_correct / total_questions) * 100, 2) if total_questions else 0
 
     # Streak Days (unique consecutive days)
-    streak_days = 0
-    last_date = None
-    for h in user_hist_qs.order_by("-completed_at"):
-        d = h.completed_at.date()
-        if last_date is None:
-            streak_days = 1
-            last_date = d
-        elif (last_date - d).days == 1:
-            streak_days += 1
-            last_date = d
-        elif last_date == d:
-            continue
-        else:
-            break
+    streak_days = stats.current_streak
 
     # Strongest subject
     strongest_subject = None
-    if user_hist_qs.exists():
-        cat_data = (
-            user_hist_qs.values("quiz__category__name")
-            .annotate(avg_score=Avg("score"))
-            .order_by("-avg_score")
-        )
-        strongest_subject = cat_data[0]["quiz__category__name"] if cat_data else None
-    
-    # New metrics for badges
-   
-    categories_attempted = user_hist_qs.values('quiz__category').distinct().count()
-    difficult_quizzes_completed = user_hist_qs.filter(quiz__difficulty__gte=4).count()
-    # Badges
-    badges = []
-    if total_quizzes >= 1:
-        badges.append({"icon": "⭐", "name": "First Quiz", "description": "Completed your first quiz"})
-    if best_score >= 90:
-        badges.append({"icon": "🏆", "name": "High Scorer", "description": "Scored above 90%"})
-    if avg_score >= 70:
-        badges.append({"icon": "🎯", "name": "Consistent", "description": "Maintained 70%+ average"})
-    if streak_days >= 3:
-        badges.append({"icon": "🔥", "name": "Streak Master", "description": f"{streak_days}-day streak"})
+    if category_stats:
+        strongest_subject = max(category_stats, key=lambda c: c.avg_score).category.name
     
-    if best_score == 100:
-        badges.append({"icon": "🥇", "name": "Perfect Score", "description": "Achieved 100% on a quiz"})
-    if categories_attempted >= 3:
-        badges.append({"icon": "🧭", "name": "Quiz Explorer", "description": f"Attempted quizzes in {categories_attempted} categories"})
-    if difficult_quizzes_completed >= 1:
-        badges.append({"icon": "🏔️", "name": "Challenger", "description": "Completed a difficult quiz"})
-
+    # Badges (awarded on submit, see services/badges.py)
+    badges = get_user_badges(user)
 
     # Recent Activity (last 5 quizzes)
-    recent_history = user_hist_qs.order_by("-completed_at")[:5]
+    recent_history = list(user_hist_qs.select_related("quiz").order_by("-completed_at")[:5])
 
-    context = {
-        "user": user,
+    return {
         "avatar": user.profile.avatar.url if hasattr(user, "profile") and user.profile.avatar else "/static/default-avatar.png",
         "name": user.profile.full_name if hasattr(user, "profile") and user.profile.full_name else user.email.split("@")[0],
         "email": user.email,
@@ -463,7 +512,15 @@ def profile_view(request):
         "badges": badges,
         "recent_history": recent_history,
     }
-    return render(request, "profile.html", context)
-
 
 
+# ---------------- METRICS ----------------
+def metrics_view(request):
+    """Prometheus scrape target: staff in the browser, or the scraper with METRICS_TOKEN."""
+    token = getattr(settings, "QUIZ_METRICS_TOKEN", None)
+    auth = request.headers.get("Authorization", "")
+    scraper = bool(token) and constant_time_compare(auth, f"Bearer {token}")
+    staff = request.user.is_authenticated and request.user.is_active and request.user.is_staff
+    if not (scraper or staff):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")